@@ -70,9 +70,16 @@ from random import seed
 from random import gauss
 from scipy.stats import linregress
 from scipy.optimize import curve_fit
+from scipy.special import gamma, gammaln, betaln
+from scipy.spatial import cKDTree
+from scipy.signal import fftconvolve
+from scipy.sparse.linalg import eigsh
 #
 import itertools
 import datetime
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 #
 # Necessary libraries for the summary report
 import subprocess
@@ -176,6 +183,11 @@ def mean_uncert(x, dx):
 # This subroutine returns a string with the average mean
 # and the corresponding uncertainty with the correct 
 # number of decimals
+#
+# Without uncertainty (e.g., equal values), only the mean
+  if ( not (dx > 0) ):
+    return str(round(x,2))
+#
 # Convert numbers to strings
   x_str  = str(x)
   dx_str = str(dx)
@@ -228,6 +240,40 @@ def mean_uncert(x, dx):
 #
   return x_out + '(' + dx_out + ')'
 #
+#----------------------------------------------------
+# Confidence level of the uncertainties (t-Student distribution)
+confidence_level = 0.95
+#
+@functools.lru_cache(maxsize=None)
+def t_quantile(df):
+# Quantile of the t-Student distribution with df degrees
+# of freedom for the confidence level (cached for each df)
+  return st.t.ppf(0.5 + 0.5*confidence_level, df)
+#
+def descriptive_statistics(x, sketch = None):
+# This subroutine returns the mean, the standard error of the mean,
+# the half-width of the confidence interval of the mean
+# (t-Student distribution), and the quartiles of each
+# column of x in a single vectorized pass.
+# x can be a one-dimensional array (a single column) or an
+# array with shape (L, ncol).
+# When a quantile sketch of x is given (see quantile_sketch), the
+# quartiles are obtained from it instead of sorting the columns.
+  x = np.asarray(x, dtype=float)
+  if ( x.ndim == 1 ):
+    x = x[:, None]
+  n = x.shape[0]
+#
+  x_mean = np.mean(x, axis=0)
+  x_sem  = np.std(x, axis=0, ddof=1) / np.sqrt(n)
+  x_half = t_quantile(n-1) * x_sem
+  if ( sketch is None ):
+    x_quartiles = np.percentile(x, [25, 50, 75], axis=0)
+  else:
+    x_quartiles = sketch_quantiles(sketch, [0.25, 0.50, 0.75])
+#
+  return {'mean' : x_mean, 'sem' : x_sem, 'uncert' : x_half, 'quartiles' : x_quartiles}
+#
 
 #----------------------------------------------------
 printt('===========================================')
@@ -402,6 +448,11 @@ PR_mean_alpha = 0.05
 PR_W_width      = 2.5
 PC_W_width      = 4
 #
+# Orders q of the Renyi entropies of the normalized squared
+# coefficients of each student (q = 1 gives the Shannon
+# entropy and q = 2 the logarithm of the PR)
+renyi_orders = [0.5, 2, 3]
+#
 # Parameters of the quartiles of the PRs
 quartile_width = 2
 quartile_color = 'k'
@@ -409,6 +460,17 @@ quartile_line  = 'dotted'
 #
 PR_hist_quartile_color = ['r', 'b', 'green', 'orange', 'purple', 'pink']
 PR_hist_quartile_alpha = 1.0
+#
+# Parameters of the quantile sketches (number of bins of
+# each column and number of students added at once)
+sketch_bins  = 4096
+sketch_chunk = 100000
+#
+# Curves of the density panels of the LSs, PRs, and PCs:
+# 'Weibull' (fitted Weibull distributions) or 'KDE' (kernel
+# density estimates), and number of points of the KDE grid
+density_estimate = 'Weibull'
+kde_grid         = 512
 #---------------------------------------------------
 # Parameters of the eigenvectors and the projections
 # on them (principal components, PCs)
@@ -430,7 +492,28 @@ PC_hist_alpha2 = 0.40
 #
 Weibull_width = 2
 #
+# Adaptive grids for the fitted PDF/CDF curves.
+# The curves are first evaluated on n_points_adaptive equally
+# spaced points within the visible axis range, and the intervals
+# where the curve deviates from a straight line by more than
+# tol_adaptive times the visible height of the curve are refined
+# (up to about max_points_adaptive points per curve)
+n_points_adaptive   = 65
+tol_adaptive        = 1e-3
+max_points_adaptive = 2000
+min_width_adaptive  = 1e-4   # Minimum width of the intervals (fraction of the range)
+#
 max_iter_Weib = 5000
+#
+# Time budget (in seconds) for each Weibull fitting.
+# If curve_fit does not converge within max_iter_Weib
+# evaluations or max_time_Weib seconds, the Weibull
+# parameters are estimated from the moments of the data
+max_time_Weib = 2.0
+#
+# Candidate distributions compared with AIC/BIC
+# for the LSs, the PRs and the projections on the PCs
+candidate_distributions = ['Weibull', 'Normal', 'Gamma', 'Beta']
 #---------------------------------------------------
 # Parameters the PCs
 colors_proj_lines = ['r', 'purple']
@@ -442,6 +525,126 @@ learning_pairs = [[0,1], [0,2], [0,3], [1,2], [1,3], [2, 3]]
 #
 # Possible combinations of the learning styles in trios
 learning_trios = [[0,1,2], [0,1,3], [0,2,3], [1,2,3]]
+#---------------------------------------------------
+# Parameters of the resampling methods (bootstrap)
+n_bootstrap    = 10000  # Number of bootstrap replicates
+bootstrap_seed = 2024   # Seed of the random number generator
+#
+# Maximum number of elements of the resampled data
+# evaluated at once in each batch (it bounds the memory)
+batch_elements_max = 2000000
+#
+# Number of threads that evaluate the batches in parallel
+n_workers = os.cpu_count()
+#---------------------------------------------------
+# Parameters of the permutation tests between cohorts
+n_permutations   = 10000  # Number of permutations (p-values resolved to 1e-4)
+permutation_seed = 2026   # Seed of the random number generator
+default_cohort   = 'All'  # Cohort of the files directly in the input folder
+#
+# Reference of the comparison of the PCAs of the cohorts
+# (None for all the students, or the name of a cohort)
+reference_cohort = None
+#---------------------------------------------------
+# PCA model of the students (saved in the output folder), and
+# reference model (e.g., of a large historical population) onto
+# which the students are projected when the file exists
+model_file           = 'chaea3s_model.npz'
+reference_model_file = 'model/chaea3s_model.npz'
+#---------------------------------------------------
+# Parameters of the search of students with similar profiles
+n_neighbours      = 3    # Number of nearest students
+similarity_radius = 3.0  # Radius (in points) of the similar profiles
+#
+# Ideal profiles (scores of the learning styles) whose closest
+# students are searched, e.g., {'Balanced' : [15, 15, 15, 15]}
+ideal_profiles = {}
+#---------------------------------------------------
+# Metadata of the students (optional file in the input folder
+# with a column 'file' with the names of the input files, given
+# as in the results export, and one column for each variable),
+# and variables whose groups are analyzed (those not found in
+# the metadata are ignored; 'Cohort' refers to the subfolders).
+# 'term' gives the reliability of the items of each term (see
+# ITEM ANALYSIS).
+metadata_file = 'metadata.csv'
+group_by      = ['Cohort', 'term', 'course', 'gender', 'grade']
+#---------------------------------------------------
+# Parameters of the clustering of the profiles (mini-batch k-means)
+n_clusters        = 3          # Number of clusters
+clustering_space  = 'scores'   # 'scores' or 'PC' (projections on the PCs)
+kmeans_batch      = 1024       # Number of profiles in each mini-batch
+kmeans_iterations = 200        # Maximum number of mini-batches
+kmeans_tolerance  = 1e-4       # Convergence (shift of the centroids)
+kmeans_seed       = 2027       # Seed of the random number generator
+#---------------------------------------------------
+# Parameters of the outlier screening (Mahalanobis distance)
+outlier_alpha        = 0.001  # Significance level of the chi-square threshold
+exclude_outliers_PCA = True   # Repeat the PCA without the outliers
+#---------------------------------------------------
+# Parameters of the null models of the eigenvalue spectrum
+n_null    = 10000  # Number of simulated cohorts of each null model
+null_seed = 2025   # Seed of the random number generator
+# Null models ('Uncorrelated' and/or 'Permutation'), in the order
+# of the table of the summary report
+null_models = ['Uncorrelated', 'Permutation']
+#---------------------------------------------------
+# Items (1-80) of the questionnaire of each learning style
+# (Activist, Reflector, Theorist, Pragmatist), as listed in
+# the calculation sheet of the input files
+n_items  = 80
+items_LS = [[ 3,  5,  7,  9, 13, 20, 26, 27, 35, 37, 41, 43, 46, 48, 51, 61, 67, 74, 75, 77],
+            [10, 16, 18, 19, 28, 31, 32, 34, 36, 39, 42, 44, 49, 55, 58, 63, 65, 69, 70, 79],
+            [ 2,  4,  6, 11, 15, 17, 21, 23, 25, 29, 33, 45, 50, 54, 60, 64, 66, 71, 78, 80],
+            [ 1,  8, 12, 14, 22, 24, 30, 38, 40, 47, 52, 53, 56, 57, 59, 62, 68, 72, 73, 76]]
+#
+# Bit-packed store of the raw answers (10 bytes per student),
+# saved in the output folder (.npy, which can be memory-mapped)
+# along with the names and cohorts of the students (.csv with the
+# same name). When answers_archive is True, a store of previous
+# terms with this name found in the input folder (archive) is added
+# to the input files (its students enter all the statistics of the
+# report, without metadata): the scores of its students are
+# obtained from the packed answers.
+answers_store_file = 'chaea3s_answers.npy'
+answers_archive    = False
+#
+# Screening of careless responses (students with raw answers):
+# students who answer all the items in the same way, whose longest
+# run of identical consecutive answers (longstring) reaches
+# careless_longstring, or whose even-odd consistency (correlation,
+# across the styles, between the answers to the odd and even items
+# of each style) is below careless_even_odd are moved to the error
+# file before any statistics. With only four styles the even-odd
+# consistency is noisy, so it is not used by default (None).
+careless_screening  = True
+careless_longstring = 40
+careless_even_odd   = None
+#
+# Principal component analysis of the items (raw answers):
+# correlations between the items ('Pearson' or 'tetrachoric',
+# cosine-pi approximation from the 2x2 tables of each pair of
+# items), number of components, and eigensolver ('full', all the
+# eigenvalues, or 'truncated', only the first components)
+item_pca            = True
+item_correlation    = 'tetrachoric'
+item_pca_components = 4
+item_pca_solver     = 'full'
+#---------------------------------------------------
+# Longitudinal store (one line per student and term, indexed by
+# the id of the student and the term, both given in the metadata
+# file) with the scores and tendencies of all the terms analyzed,
+# updated in each run (.csv, or .parquet if a parquet engine is
+# installed). The changes between consecutive terms of the same
+# students are obtained from it without reading previous input files.
+# Terms follow the order of longitudinal_terms (chronological
+# list, e.g. ['Spring 2024', 'Fall 2024']); when None, or for the
+# terms not listed (placed after them), they are sorted as strings,
+# so they must then be named to sort chronologically (e.g. '2024-1').
+longitudinal_file  = 'longitudinal/chaea3s_longitudinal.csv'
+longitudinal_id    = 'id'
+longitudinal_term  = 'term'
+longitudinal_terms = None
 #----------------------------------------------------------
 printt('-------------------------------------------')
 printt('  Definition of tendency/plotting functions...')
@@ -528,6 +731,14 @@ def scatter_tendency(ls, value):
                     printt('Wrong input for the ls :', ls)
   return tendency
 #===================================================
+# Largest number of points for each of the tendencies
+# (very low, low, moderate, high and very high)
+# towards the different LSs (same as in scatter_tendency)
+tendency_upper_limits = {'Activist'   : [ 6,  8, 12, 14, 20],
+                         'Reflector'  : [10, 13, 17, 19, 20],
+                         'Theorist'   : [ 6,  9, 13, 15, 20],
+                         'Pragmatist' : [ 8, 10, 13, 15, 20]}
+#===================================================
 def tendency_long_name(tendency):
   if(tendency == 'vl'):
     return 'Very low'
@@ -724,6 +935,170 @@ def scatter_properties(tendency, value):
       scatter_size = 500
   #               
   return [tendency, scatter_color, scatter_size, scatter_alpha, scatter_symbol]
+#
+#===================================================
+def adaptive_grid(f, xmin, xmax):
+  # It returns the points x (and the values f(x)) where the curve f
+  # is plotted within the visible range [xmin, xmax].
+  # The intervals are bisected where the curvature of f is large,
+  # i.e., where f at the midpoint departs from the straight line
+  # joining the extremes of the interval, and where f stops being
+  # finite (e.g., below the location of a translated Weibull).
+  # The intervals narrower than min_width_adaptive*(xmax-xmin)
+  # are not bisected.
+  x  = np.linspace(xmin, xmax, n_points_adaptive)
+  fx = f(x)
+  width_min = min_width_adaptive * (xmax - xmin)
+  #
+  while ( len(x) < max_points_adaptive ):
+    finite = np.isfinite(fx)
+    if not np.any(finite):
+      break
+    span = np.max(fx[finite]) - np.min(fx[finite])
+    #
+    xm = 0.5 * (x[:-1] + x[1:])
+    fm = f(xm)
+    error  = np.abs(fm - 0.5 * (fx[:-1] + fx[1:]))
+    refine = ((error > tol_adaptive * span) | (finite[:-1] != finite[1:])) & (np.diff(x) > width_min)
+    if not np.any(refine):
+      break
+    #
+    index = np.nonzero(refine)[0] + 1
+    x  = np.insert(x,  index, xm[refine])
+    fx = np.insert(fx, index, fm[refine])
+  #
+  return x, fx
+#
+#===================================================
+# Histograms shared by all the figures and tables.
+# The bin counts of each variable (LS, PR, and PC) are
+# computed only once per run and saved in the dictionary
+# histograms, which contains the counts of each column of
+# the variable (one line per column) and the edges of the bins.
+# The LS scores are integers, so that their bins are centered
+# on the integers 0, 1, ..., 20 and counted with bincount.
+histograms = {}
+#
+def integer_edges(ncol, vmax):
+  # Bins centered on the integers 0, 1, ..., vmax (for each column)
+  return np.tile(np.arange(-0.5, vmax+1), (ncol, 1))
+#
+def uniform_edges(vmin, vmax, nbins):
+  # nbins equally spaced bins between vmin and vmax
+  # (vmin and vmax may be different for each column)
+  vmin = np.atleast_1d(vmin).astype(float)
+  vmax = np.atleast_1d(vmax).astype(float)
+  return vmin[:,None] + (vmax-vmin)[:,None] * np.linspace(0, 1, nbins+1)[None,:]
+#
+def bin_counts(values, edges):
+  # Bin counts of all the columns of values (L x ncol) for
+  # equally spaced edges (ncol x nbins+1) in a single bincount.
+  # As in np.histogram, the last bin includes its right edge
+  # (values out of the edges are counted in the first/last bins).
+  ncol  = values.shape[1]
+  nbins = edges.shape[1] - 1
+  width = edges[:,1] - edges[:,0]
+  width[width == 0] = 1
+  index = np.floor((values - edges[:,0]) / width).astype(int)
+  index = np.clip(index, 0, nbins-1)
+  index = index + nbins * np.arange(ncol)
+  return np.bincount(index.ravel(), minlength = ncol*nbins).reshape(ncol, nbins)
+#
+def histogram_counts(name, values, edges):
+  histograms[name] = {'counts' : bin_counts(values, edges), 'edges' : edges}
+  return histograms[name]
+#
+def merge_histograms(hist_a, hist_b):
+  # Hook to reuse the cached counts of different groups of
+  # students for the merged cohort (the bins must coincide,
+  # which is always the case for the integer-aligned LS bins)
+  if not np.allclose(hist_a['edges'], hist_b['edges']):
+    raise ValueError('Histograms with different bins cannot be merged')
+  return {'counts' : hist_a['counts'] + hist_b['counts'], 'edges' : hist_a['edges']}
+#
+def plot_histogram(ax, hist, j, **kwargs):
+  # Plot the cached histogram of column j (it returns the same
+  # values as ax.hist)
+  edges = hist['edges'][j]
+  return ax.hist(edges[:-1], bins = edges, weights = hist['counts'][j], **kwargs)
+#
+#===================================================
+# Quantile sketches.
+# The quantiles (quartiles and medians) of pr, proj and probLS are
+# obtained from sketches formed by the counts of sketch_bins bins
+# between known bounds of each variable (1 to K for the PRs, 0 to
+# 100 for the probabilities, and the largest distance between a
+# possible student and the mean for the projections). The sketches
+# are filled in a single pass over chunks of sketch_chunk students
+# (bounded memory), and those of different chunks or groups of
+# students are merged by adding their counts (merge_histograms).
+# The quantiles are interpolated within the bins, so that their
+# error is smaller than the width of the bins.
+sketches = {}
+#
+def quantile_sketch(name, values, vmin, vmax, sketch = None):
+  edges = uniform_edges(vmin, vmax, sketch_bins)
+  if ( sketch is None ):
+    sketch = {'counts' : np.zeros((values.shape[1], sketch_bins), dtype=int), 'edges' : edges}
+  for i0 in range(0, len(values), sketch_chunk):
+    sketch = merge_histograms(sketch, {'counts' : bin_counts(values[i0:i0+sketch_chunk], edges), 'edges' : edges})
+  sketches[name] = sketch
+  return sketch
+#
+def sketch_quantiles(sketch, q):
+  # Quantiles q (list of fractions) of each column (len(q) x ncol)
+  counts = sketch['counts']
+  edges  = sketch['edges']
+  cum    = np.cumsum(counts, axis=1)
+  target = np.array(q)[:,None] * cum[:,-1][None,:]
+  ib     = np.minimum(np.sum(cum[None,:,:] < target[:,:,None], axis=2), counts.shape[1]-1)
+  column = np.arange(counts.shape[0])[None,:]
+  below  = np.where(ib > 0, cum[column, np.maximum(ib-1, 0)], 0)
+  inbin  = np.maximum(counts[column, ib], 1)
+  width  = edges[:,1] - edges[:,0]
+  return edges[column, ib] + np.clip((target - below) / inbin, 0, 1) * width[None,:]
+#
+#===================================================
+# Binned kernel density estimates.
+# The KDEs are computed from the shared bin counts (the histograms
+# of the scores and the quantile sketches of the PRs and the
+# projections) instead of from the individual students: the counts
+# are linearly binned onto a uniform grid of kde_grid points and
+# convolved with a Gaussian kernel by FFT, which costs
+# O(L + grid log grid) instead of O(L grid). The bandwidth follows
+# Silverman's rule, computed from the counts as well.
+def binned_kde(centers, counts, bandwidth = None):
+  n = counts.sum()
+  mean = np.sum(counts * centers) / n
+  sd   = np.sqrt(np.sum(counts * (centers - mean)**2) / n)
+  cum  = np.cumsum(counts)
+  iqr  = centers[np.searchsorted(cum, 0.75*n)] - centers[np.searchsorted(cum, 0.25*n)]
+  if ( bandwidth is None ):
+    spread = min(sd, iqr/1.34) if iqr > 0 else sd
+    bandwidth = 0.9 * spread * n**(-0.2)
+  bandwidth = max(bandwidth, centers[1] - centers[0])
+#
+# Linear binning onto the grid
+  x  = np.linspace(centers[0] - 3*bandwidth, centers[-1] + 3*bandwidth, kde_grid)
+  dx = x[1] - x[0]
+  position = (centers - x[0]) / dx
+  i0 = np.floor(position).astype(int)
+  w1 = position - i0
+  grid_counts = (np.bincount(i0, counts*(1-w1), minlength=kde_grid+1) +
+                 np.bincount(i0+1, counts*w1, minlength=kde_grid+1))[0:kde_grid]
+#
+# Convolution with the Gaussian kernel (truncated at 5 bandwidths)
+  m = min(int(np.ceil(5*bandwidth/dx)), kde_grid)
+  kernel = np.exp(-0.5*(dx*np.arange(-m, m+1)/bandwidth)**2) / (np.sqrt(2*np.pi)*bandwidth)
+  density = np.maximum(fftconvolve(grid_counts, kernel, mode='same'), 0) / n
+  return x, density
+#
+def kde_overlay(source, j, panel):
+  # KDE of column j of the counts source scaled as the counts
+  # per bin of the histogram panel
+  edges = source['edges'][j]
+  x, density = binned_kde(0.5*(edges[:-1] + edges[1:]), source['counts'][j])
+  return x, density * source['counts'][j].sum() * (panel['edges'][j][1] - panel['edges'][j][0])
 printt('-------------------------------------------')
 printt('  Definition of tendency/plotting functions done!')
 printt('-------------------------------------------')
@@ -761,6 +1136,199 @@ def Wweibull_translated(x, alpha_Weibull, k_Weibull, theta_Weibull):
 # Probability density function for the translated Weibull distribution
 def Pweibull_translated(x, alpha_Weibull, k_Weibull, theta_Weibull):
   return (k_Weibull/alpha_Weibull) * ((x-theta_Weibull)/alpha_Weibull)**(k_Weibull-1) * np.exp(-((x-theta_Weibull)/alpha_Weibull)**k_Weibull)
+#
+# Moment-based estimates of the Weibull parameters.
+# The shape parameter is obtained from the coefficient of
+# variation, k = (std/mean)^(-1.086), and the scale parameter
+# from the mean, mean = alpha * Gamma(1 + 1/k).
+# They are used when the fitting of the cumulative
+# distribution does not converge.
+k_Weibull_max = 50.0
+#
+def Weibull_moments(x):
+  x_mean = np.mean(x)
+  x_std  = np.std(x)
+#
+# A Weibull distribution cannot describe a column
+# whose values are all equal to zero
+  if ( x_mean <= 0 ):
+    return [np.nan, np.nan]
+#
+  if ( x_std == 0 ):
+    k_Weibull = k_Weibull_max
+  else:
+    k_Weibull = min((x_std/x_mean)**(-1.086), k_Weibull_max)
+  alpha_Weibull = x_mean / gamma(1 + 1/k_Weibull)
+  return [alpha_Weibull, k_Weibull]
+#
+# Latency-bounded fitting of the cumulative distribution y(x)
+# (x sorted) using a Weibull distribution.
+# The fitting is stopped if it exceeds max_iter_Weib function
+# evaluations or max_time_Weib seconds, and the Weibull parameters
+# are then estimated from the moments of x. The convergence status,
+# the number of evaluations and the elapsed time are returned
+# in fit_info, and also printed in the log file.
+def fit_Weibull(x, y, p0):
+  nfev  = [0]
+  start = time.perf_counter()
+#
+  def Wweibull_budget(x, alpha_Weibull, k_Weibull):
+    nfev[0] = nfev[0] + 1
+    if ( time.perf_counter() - start > max_time_Weib ):
+      raise TimeoutError
+    return Wweibull(x, alpha_Weibull, k_Weibull)
+#
+  if ( x[0] == x[-1] ):
+#   All the values are equal (degenerate column)
+    status = 'Degenerate'
+  else:
+    try:
+      param = curve_fit(Wweibull_budget, x, y, p0, maxfev = max_iter_Weib)
+      params = param[0]
+      if ( np.all(np.isfinite(params)) and params[0] > 0 ):
+        status = 'Converged'
+      else:
+        status = 'Failed'
+    except TimeoutError:
+      status = 'Time budget'
+    except (RuntimeError, ValueError):
+      status = 'Max. evaluations'
+#
+  if ( status == 'Converged' ):
+    method = 'Least squares'
+  else:
+    params = Weibull_moments(x)
+    method = 'Moments'
+#
+  elapsed = time.perf_counter() - start
+  fit_info = {'status' : status, 'method' : method, 'nfev' : nfev[0], 'time' : elapsed}
+  printt('    Fitting status : ' + status + ' (' + method + '), ' + str(nfev[0]) + ' evaluations, ' + str(round(1000*elapsed, 1)) + ' ms')
+#
+  return [params[0], params[1]], fit_info
+#
+# Short description of the fitting status for the tables of the report
+def fit_status_text(fit_info):
+  if ( fit_info['method'] == 'Moments' ):
+    return fit_info['status'] + ' (moments)'
+  return fit_info['status']
+#
+#---------------------------------------------------
+# Model selection among several candidate distributions
+#---------------------------------------------------
+# The Weibull distributions are compared with normal, gamma and beta
+# distributions fitted to the same (sorted) columns. All of them,
+# but the beta distribution (moments), are maximum-likelihood fits
+# (the Weibull ones starting from the fittings of W(x)). All the
+# log-likelihoods are obtained in a single vectorized pass from
+# the sufficient statistics of the column (sums of x, x^2, log(x),
+# log(1-x) and (x/alpha)^k), so that adding candidates does not
+# multiply the runtime. The gamma and beta distributions are
+# defined on the support [lower, upper] of the variable
+# (the beta distribution on the values scaled to 0-1), and the
+# Weibull distribution is translated by theta_Weibull.
+# All the densities refer to the same variable x, so that their
+# AIC = 2 n_par - 2 log(L) and BIC = n_par log(n) - 2 log(L)
+# can be directly compared.
+# If the support is estimated from the data (e.g., for the
+# projections on the PCs), the location and the bounds
+# are counted as additional parameters.
+def fit_candidates(x, lower, upper, Weibull_params, theta_Weibull = 0, estimated_support = False):
+  n      = len(x)
+  xrange = upper - lower
+#
+# Values exactly on the boundaries of the support are moved
+# slightly inside it, so that all the densities are finite
+  delta = 1e-3 * xrange
+  u = np.clip(x - lower, delta, xrange - delta)
+  z = u / xrange
+  w = np.clip(x - theta_Weibull, delta, None)
+#
+# Sufficient statistics
+  sum_u     = np.sum(u)
+  sum_logu  = np.sum(np.log(u))
+  sum_logz  = np.sum(np.log(z))
+  sum_log1z = np.sum(np.log(1 - z))
+  sum_logw  = np.sum(np.log(w))
+  x_mean    = np.mean(x)
+  x_var     = np.var(x)
+  u_mean    = sum_u / n
+  z_mean    = np.mean(z)
+  z_var     = np.var(z)
+#
+  params  = {}
+  loglik  = {}
+  n_par   = {}
+  for name in candidate_distributions:
+    loglik[name] = np.nan
+#
+  if ( x_var > 0 ):
+#   Normal distribution (maximum likelihood)
+    params['Normal'] = [x_mean, np.sqrt(x_var)]
+    loglik['Normal'] = -0.5 * n * (np.log(2*np.pi*x_var) + 1)
+    n_par['Normal']  = 2
+#
+#   Weibull distribution (maximum likelihood: Newton steps on k,
+#   starting from the parameters of the fitting of W(x), and
+#   alpha = (<w^k>)^(1/k))
+    k_Weibull = Weibull_params[1]
+    logw = np.log(w)
+    for iteration in range(0,50):
+      wk  = np.exp(k_Weibull * (logw - logw.max()))
+      m1  = np.sum(wk * logw) / np.sum(wk)
+      m2  = np.sum(wk * logw**2) / np.sum(wk)
+      g   = m1 - 1/k_Weibull - sum_logw/n
+      dg  = m2 - m1**2 + 1/k_Weibull**2
+      step = g / dg
+      while ( k_Weibull - step <= 0 ):
+        step = 0.5 * step
+      k_Weibull = k_Weibull - step
+      if ( abs(step) < 1e-10 * k_Weibull ):
+        break
+    alpha_Weibull = np.mean(w**k_Weibull)**(1/k_Weibull)
+    params['Weibull'] = [alpha_Weibull, k_Weibull]
+    loglik['Weibull'] = ( n * np.log(k_Weibull) - n * k_Weibull * np.log(alpha_Weibull)
+                        + (k_Weibull - 1) * sum_logw - np.sum((w/alpha_Weibull)**k_Weibull) )
+    n_par['Weibull']  = 2 + estimated_support
+#
+#   Gamma distribution (approximate maximum likelihood)
+    sg = np.log(u_mean) - sum_logu / n
+    a_gamma     = (3 - sg + np.sqrt((sg - 3)**2 + 24*sg)) / (12*sg)
+    scale_gamma = u_mean / a_gamma
+    params['Gamma'] = [a_gamma, scale_gamma]
+    loglik['Gamma'] = ( (a_gamma - 1) * sum_logu - n * a_gamma * np.log(scale_gamma)
+                      - n * gammaln(a_gamma) - sum_u / scale_gamma )
+    n_par['Gamma']  = 2 + estimated_support
+#
+#   Beta distribution (method of moments on the scaled values)
+    common = z_mean * (1 - z_mean) / z_var - 1
+    a_beta = z_mean * common
+    b_beta = (1 - z_mean) * common
+    if ( a_beta > 0 and b_beta > 0 ):
+      params['Beta'] = [a_beta, b_beta]
+      loglik['Beta'] = ( (a_beta - 1) * sum_logz + (b_beta - 1) * sum_log1z
+                       - n * betaln(a_beta, b_beta) - n * np.log(xrange) )
+      n_par['Beta']  = 2 + 2 * estimated_support
+#
+  AIC = {}
+  BIC = {}
+  for name in candidate_distributions:
+    if ( name in n_par and np.isfinite(loglik[name]) ):
+      AIC[name] = 2 * n_par[name] - 2 * loglik[name]
+      BIC[name] = n_par[name] * np.log(n) - 2 * loglik[name]
+    else:
+      AIC[name] = np.nan
+      BIC[name] = np.nan
+#
+  best = ''
+  for name in candidate_distributions:
+    if ( np.isfinite(BIC[name]) and ( best == '' or BIC[name] < BIC[best] ) ):
+      best = name
+#
+  for name in candidate_distributions:
+    printt('    ' + name.ljust(8) + ' AIC : ' + str(round(AIC[name], 2)) + '   BIC : ' + str(round(BIC[name], 2)))
+  printt('    Best model (BIC) : ' + best)
+#
+  return {'params' : params, 'loglik' : loglik, 'AIC' : AIC, 'BIC' : BIC, 'best' : best}
 printt(' ')
 #
 printt('-------------------------------------------')
@@ -860,17 +1428,73 @@ nan = 0
 #
 studentsin = [] # List with the names of all the students
 students   = [] # List with the names of the students that have correct input data
+cohorts    = [] # Cohort (subfolder of the input folder) of each student
 data       = [] # Input data
-#
-# Iteration over all input files (.xls and .xlsx)
-for files in os.listdir(input_folder):
+answers    = [] # Raw answers to the items of the questionnaire
+#
+# Iteration over all input files (.xls and .xlsx), including
+# those in subfolders, which define the cohorts (classes, year
+# groups, programs...) of the students. The names of the files
+# in subfolders are given relative to the input folder.
+for root, dirs, files_root in os.walk(input_folder):
+  dirs.sort()
+  for files in files_root:
 # 
 # xls and xlsx files
-  if ((files.endswith('.xls')) or (files.endswith('.xlsx'))):
-    studentsin.append(files)
+    if ((files.endswith('.xls')) or (files.endswith('.xlsx'))):
+      studentsin.append(os.path.relpath(os.path.join(root, files), input_folder).replace(os.sep, '/'))
 #
 studentsin = sorted(studentsin)
 #
+def raw_answers(sheet, scores):
+# Answers (0/1) to the n_items items of the questionnaire,
+# read from the pairs of columns (item, answer) of each
+# learning style in rows 6-25 of the calculation sheet.
+# NaN when they are missing, when the items do not match
+# items_LS, or when they do not add up to the scores.
+  answers = np.full(n_items, np.nan)
+  try:
+    block = sheet.iloc[5:25, 1:9].astype(float).values
+  except (ValueError, IndexError):
+    return answers
+  if ( block.shape != (20, 8) or np.isnan(block).any() ):
+    return answers
+  for k in range(0,len(items_LS)):
+    items_k   = block[:, 2*k].astype(int)
+    answers_k = block[:, 2*k+1]
+    if ( (set(items_k) != set(items_LS[k])) or (not np.isin(answers_k, [0, 1]).all())
+         or (answers_k.sum() != scores[k]) ):
+      return np.full(n_items, np.nan)
+    answers[items_k - 1] = answers_k
+  return answers
+#
+# Bit masks of the items of each learning style (K, 10) and
+# number of bits set in each byte (when np.bitwise_count, numpy
+# >= 2.0, is not available)
+style_masks = np.zeros((len(items_LS), n_items), dtype=bool)
+for k in range(0,len(items_LS)):
+  style_masks[k, np.asarray(items_LS[k]) - 1] = True
+style_masks = np.packbits(style_masks, axis=1)
+popcount_table = np.array([bin(b).count('1') for b in range(256)], dtype=np.uint8)
+#
+def pack_answers(X):
+# Answers (n, n_items) packed into n_items/8 bytes per student
+  return np.packbits(np.asarray(X) > 0, axis=1)
+#
+def unpack_answers(packed):
+# Answers (n, n_items) of the packed answers, as floats
+  return np.unpackbits(packed, axis=1, count=n_items).astype(float)
+#
+def packed_scores(packed):
+# Scores (n, K) of the learning styles from the packed answers:
+# number of bits set in the items of each style (popcounts)
+  masked = np.asarray(packed)[:, None, :] & style_masks[None, :, :]
+  if ( hasattr(np, 'bitwise_count') ):
+    counts = np.bitwise_count(masked)
+  else:
+    counts = popcount_table[masked]
+  return counts.sum(axis=2, dtype=np.int64).astype(float)
+#
 for filei in studentsin:
 #
     data_in = []
@@ -927,9 +1551,120 @@ for filei in studentsin:
     else:
       printt(file_line)
       students.append(filei)    # LS values added to data matrix
+      cohorts.append(os.path.dirname(filei) if os.path.dirname(filei) != '' else default_cohort)
       data.append([n0, n1, n2, n3])    # LS values added to data matrix
-#
-data = np.vstack(data) # Stack the list
+      answers.append(raw_answers(data_in, [n0, n1, n2, n3]))
+#
+data = np.vstack(data) if len(data) > 0 else np.zeros((0, len(items_LS))) # Stack the list
+#
+# Raw answers to the items (students with complete answers
+# consistent with their scores), stored bit-packed
+answers = np.vstack(answers) if len(answers) > 0 else np.zeros((0, n_items))
+answers_available = ~np.isnan(answers).any(axis=1)
+answers_packed = pack_answers(np.nan_to_num(answers))
+del answers
+#
+# Archive of packed answers of previous terms (memory-mapped, only
+# if answers_archive). The students of the archive with the same
+# name and answers as a student read from the input files are not
+# added again; those with the same name but different answers
+# (e.g., another term) are added with the prefix 'archive/'.
+archive_name = input_folder + answers_store_file
+archive_students_name = os.path.splitext(archive_name)[0] + '.csv'
+n_archive = 0
+if ( os.path.isfile(archive_name) and os.path.isfile(archive_students_name) and not answers_archive ):
+  printt(' Archive of answers : ' + archive_name + ' ignored (answers_archive = False)')
+if ( answers_archive and os.path.isfile(archive_name) and os.path.isfile(archive_students_name) ):
+  archive = np.load(archive_name, mmap_mode='r')
+  archive_students = pd.read_csv(archive_students_name, dtype=str)
+  current_answers = {students[i] : answers_packed[i].tobytes() for i in np.flatnonzero(answers_available)}
+  current_names = set(students)
+  archive_names = archive_students['Student'].values
+  archive_duplicated = [i for i in np.flatnonzero(archive_students['Student'].isin(current_names).values)
+                        if current_answers.get(archive_names[i]) == np.asarray(archive[i]).tobytes()]
+  archive_new = np.setdiff1d(np.arange(len(archive_students)), archive_duplicated)
+  archive_packed = np.asarray(archive[archive_new])
+  n_archive = len(archive_new)
+  students.extend([name if name not in current_names else 'archive/' + name for name in archive_names[archive_new]])
+  cohorts.extend(archive_students['Cohort'].fillna(default_cohort).values[archive_new])
+  data = np.vstack([data, packed_scores(archive_packed)])
+  answers_packed = np.vstack([answers_packed, archive_packed])
+  answers_available = np.concatenate([answers_available, np.ones(len(archive_new), dtype=bool)])
+  printt(' Archive of answers : ' + archive_name + ' (' + str(len(archive_new)) + ' of ' + str(len(archive_students)) + ' students added)')
+#
+# Store of the packed answers
+answers_store_name = output_gen + '/' + answers_store_file
+np.save(answers_store_name, answers_packed[answers_available])
+pd.DataFrame({'Student' : np.asarray(students)[answers_available],
+              'Cohort'  : np.asarray(cohorts)[answers_available]}).to_csv(os.path.splitext(answers_store_name)[0] + '.csv', index=False)
+printt(' Raw answers to the items : ' + str(int(answers_available.sum())) + ' of ' + str(len(data)) + ' students (' + str(answers_packed.nbytes) + ' bytes)')
+printt(' Saving ' + answers_store_name)
+#
+# Careless responses
+def careless_indicators(X):
+# Longstring, even-odd consistency and all-yes/all-no indicators
+# of the answers X (n, n_items) of all the students at once
+  n = len(X)
+# Start of the run of identical answers at each item
+  changes = np.ones((n, n_items), dtype=bool)
+  changes[:, 1:] = (X[:, 1:] != X[:, :-1])
+  positions = np.arange(n_items)
+  run_start = np.maximum.accumulate(np.where(changes, positions, 0), axis=1)
+  longstring = (positions - run_start + 1).max(axis=1)
+#
+# Proportions of yes in the odd and even items (alternating items
+# of each style) and their correlation across the styles
+  odd  = np.column_stack([X[:, np.sort(items_LS[k])[0::2] - 1].mean(axis=1) for k in range(0,len(items_LS))])
+  even = np.column_stack([X[:, np.sort(items_LS[k])[1::2] - 1].mean(axis=1) for k in range(0,len(items_LS))])
+  dodd  = odd  - odd.mean(axis=1, keepdims=True)
+  deven = even - even.mean(axis=1, keepdims=True)
+  norm  = np.sqrt((dodd*dodd).sum(axis=1) * (deven*deven).sum(axis=1))
+  even_odd = np.full(n, np.nan)
+  np.divide((dodd*deven).sum(axis=1), norm, out=even_odd, where=(norm > 0))
+#
+  n_yes = X.sum(axis=1)
+  all_same = (n_yes == 0) | (n_yes == n_items)
+  return {'longstring' : longstring, 'even_odd' : even_odd, 'all_same' : all_same}
+#
+careless = np.zeros(len(data), dtype=bool)
+careless_longstring_values = np.full(len(data), np.nan)
+careless_even_odd_values   = np.full(len(data), np.nan)
+if ( careless_screening and np.any(answers_available) ):
+  indicators = careless_indicators(unpack_answers(answers_packed[answers_available]))
+  careless_longstring_values[answers_available] = indicators['longstring']
+  careless_even_odd_values[answers_available]   = indicators['even_odd']
+  careless[answers_available] = indicators['all_same'] | (indicators['longstring'] >= careless_longstring)
+  if ( careless_even_odd is not None ):
+    careless[answers_available] |= (indicators['even_odd'] < careless_even_odd)
+  for i in np.flatnonzero(careless):
+    file_line = (students[i]+'      careless responses (longstring '+str(int(careless_longstring_values[i]))
+                 +', even-odd '+str(round(careless_even_odd_values[i],2))+')\n')
+    if( nan == 0):
+      error_file = open(error_file_name, "w")
+      nan = 1
+    else:
+      error_file = open(error_file_name, "a")
+    printt(file_line)
+    error_file.write(file_line)
+    error_file.close()
+#
+  keep = ~careless
+  students = [students[i] for i in np.flatnonzero(keep)]
+  cohorts  = [cohorts[i] for i in np.flatnonzero(keep)]
+  data     = data[keep]
+  answers_packed    = answers_packed[keep]
+  answers_available = answers_available[keep]
+  careless_longstring_values = careless_longstring_values[keep]
+  careless_even_odd_values   = careless_even_odd_values[keep]
+printt(' Careless responses : ' + str(int(careless.sum())) + ' students moved to the error file')
+#
+# Cohorts and index of the cohort of each student
+cohort_names, cohort_index = np.unique(cohorts, return_inverse=True)
+n_cohorts = len(cohort_names)
+printt(' Cohorts : ' + str(n_cohorts))
+for c in range(0,n_cohorts):
+  printt('   ' + cohort_names[c] + ' : ' + str(np.sum(cohort_index == c)) + ' students')
+printt(' ')
 #
 xa = data[:, 0]
 xr = data[:, 1]
@@ -1016,22 +1751,12 @@ printt('  Uncertainties...')
 printt('------------------------------------------')
 # Create 95% confidence interval for population mean weight.
 #
-confidence_interval_ACT=st.t.interval(confidence=0.95, df=len(data)-1, loc=np.mean(xa), scale=st.sem(xa))
-uncert_abs_ACT=0.5*(confidence_interval_ACT[1]-confidence_interval_ACT[0])
-#
-confidence_interval_REF=st.t.interval(confidence=0.95, df=len(data)-1, loc=np.mean(xr), scale=st.sem(xr)) 
-uncert_abs_REF=0.5*(confidence_interval_REF[1]-confidence_interval_REF[0])
-#
-confidence_interval_THEO=st.t.interval(confidence=0.95, df=len(data)-1, loc=np.mean(xt), scale=st.sem(xt)) 
-uncert_abs_THEO=0.5*(confidence_interval_THEO[1]-confidence_interval_THEO[0])
-#
-confidence_interval_PRA=st.t.interval(confidence=0.95, df=len(data)-1, loc=np.mean(xp), scale=st.sem(xp)) 
-uncert_abs_PRA=0.5*(confidence_interval_PRA[1]-confidence_interval_PRA[0])
+statistics_data = descriptive_statistics(data)
+dxmean = statistics_data['uncert']
+[uncert_abs_ACT, uncert_abs_REF, uncert_abs_THEO, uncert_abs_PRA] = dxmean
 #
-dxmean = [uncert_abs_ACT, uncert_abs_REF, uncert_abs_THEO, uncert_abs_PRA]
-#
-confidence_interval_ALL=st.t.interval(confidence=0.95, df=len(xall)-1, loc=np.mean(xall), scale=st.sem(xall)) 
-uncert_abs_ALL=0.5*(confidence_interval_ALL[1]-confidence_interval_ALL[0])
+statistics_all = descriptive_statistics(xall)
+uncert_abs_ALL = statistics_all['uncert'][0]
 #
 printt('  Uncertainties')
 printt('    Uncert(xa),  # : ' + str(uncert_abs_ACT))
@@ -1198,6 +1923,34 @@ printt(' ')
 #
 #
 
+#===================================================
+# HISTOGRAMS OF THE LSs
+#===================================================
+printt('===========================================')
+printt('HISTOGRAMS OF THE LSs...')
+printt('===========================================')
+printt(' ')
+# The LS scores are counted once with integer-aligned bins.
+# These counts are used in the tendencies and in the figures.
+scores_integer = np.all(data == np.round(data))
+histogram_counts('LS', data, integer_edges(K, 20))
+printt('  Integer scores : ' + str(scores_integer))
+printt('  LS counts      : ' + str(histograms['LS']['counts']))
+printt(' ')
+printt('===========================================')
+printt('HISTOGRAMS OF THE LSs DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+
 #===================================================
 # TENDENCIES TO THE DIFFERENT LSs
 #===================================================
@@ -1232,6 +1985,10 @@ for i in range(0,L):
   tendency_matrix_all[i][2] = tendency_vector[2]
   tendency_matrix_all[i][3] = tendency_vector[3]
 #
+# For integer scores, the tendencies are counted below
+# from the histograms of the LSs
+  if ( scores_integer ):
+    continue
   for j in range(0,K):
     if ( tendency_vector[j] == 'vl' ) :
       tendency_matrix[j,0] = tendency_matrix[j,0] + 1
@@ -1248,6 +2005,11 @@ for i in range(0,L):
             if ( tendency_vector[j] == 'vh' ) :
               tendency_matrix[j,4] = tendency_matrix[j,4] + 1
 #
+if ( scores_integer ):
+  for j in range(0,K):
+    first_score = np.concatenate(([0], np.array(tendency_upper_limits[Label_LS[j]][:-1]) + 1))
+    tendency_matrix[j] = np.add.reduceat(histograms['LS']['counts'][j], first_score)
+#
 #printt( '  Tendency matrix     : ', tendency_matrix)              
 tendency_matrix_percentage = tendency_matrix * 100 / L
 #printt( '  Tendency matrix (%) : ', tendency_matrix_percentage)
@@ -1424,13 +2186,10 @@ printt(' ')
 printt('   probLS : ' + str(probLS))
 printt(' ')
 # Mean values and uncertainties of the probabilities
-probLSmean = np.array([np.mean(probLS[:,0]), np.mean(probLS[:,1]), np.mean(probLS[:,2]), np.mean(probLS[:,3])])
+statistics_probLS = descriptive_statistics(probLS, quantile_sketch('probLS', probLS, np.zeros(K), 100*np.ones(K)))
+probLSmean = statistics_probLS['mean']
 #
-uncert_abs_probLS = [0, 0, 0, 0]
-for j in range(0,K):
-  probj = probLS[:,j]
-  confidence_interval_probLS=st.t.interval(confidence=0.95, df=len(probj)-1, loc=probLSmean[j], scale=st.sem(probj)) 
-  uncert_abs_probLS[j]=0.5*(confidence_interval_probLS[1]-confidence_interval_probLS[0])
+uncert_abs_probLS = statistics_probLS['uncert']
 #
 printt('  The mean values of the corresponding probabilities')
 printt('  do not nullify (as all of them are positive or zero)')
@@ -1474,13 +2233,13 @@ printt(' ')
 printt('-------------------------------------------')
 printt(' W(LS)...')  
 printt('-------------------------------------------')
-xWeib   = np.arange(0,20.1, 0.001)
-#
 ymin  = 0
 ymax  = 1.01
 ymaxx = 10000000000
 #
 parameters_Weibull_LS20 = np.zeros((K,2))
+fit_info_LS20           = [None] * K
+model_selection_LS20    = [None] * K
 #
 for ils in range(0, K):
   printt('   LS 0-20 :' + Label_LS[ils])
@@ -1494,10 +2253,9 @@ for ils in range(0, K):
     y[i] = y[i-1] + dy
 #
 # Fitting using Weibull distribution
-  param = curve_fit(Wweibull, x, y, [xmean[ils], 1], maxfev = max_iter_Weib)
-  printt('    ' + str(param))
-  [alpha_Weibull, k_Weibull] = param[0]
+  [alpha_Weibull, k_Weibull], fit_info_LS20[ils] = fit_Weibull(x, y, [xmean[ils], 1])
   parameters_Weibull_LS20[ils] = [alpha_Weibull, k_Weibull]
+  model_selection_LS20[ils] = fit_candidates(x, 0, 20, [alpha_Weibull, k_Weibull])
   printt('    alpha_Weibull : ' + str(alpha_Weibull))
   printt('    k_Weibull     : ' + str(k_Weibull))  
   printt(' ')
@@ -1561,7 +2319,8 @@ for ils in range(0, K):
   axs[panels[ils][0], panels[ils][1]].tick_params(axis='both', which='major', labelsize = ticksize_PC)
 #
   axs[panels[ils][0], panels[ils][1]].plot(x2, y2,                                 lw = PC_width,   color = PC_color[ils], ls = PC_line[ils])
-  axs[panels[ils][0], panels[ils][1]].plot(xWeib,Wweibull(xWeib, alpha_Weibull, k_Weibull) , lw = PC_W_width, color = PC_color[ils], ls = PC_line_bis[ils])  
+  xWeib, WWeib = adaptive_grid(lambda x: Wweibull(x, alpha_Weibull, k_Weibull), 0, 20)
+  axs[panels[ils][0], panels[ils][1]].plot(xWeib, WWeib, lw = PC_W_width, color = PC_color[ils], ls = PC_line_bis[ils])  
 #
 # Plot the average value as a vertical line
 # we do not plot the uncertainties as they can be very large
@@ -1591,8 +2350,9 @@ printt(' ')
 printt('-------------------------------------------')
 printt(' W(probLS)...')  
 printt('-------------------------------------------')
-xWeib   = np.arange(0, 1.1, 0.001)
 parameters_Weibull_LS = np.zeros((K,2))
+fit_info_LS           = [None] * K
+model_selection_LS    = [None] * K
 #
 #
 for ils in range(0, K):
@@ -1607,10 +2367,9 @@ for ils in range(0, K):
     y[i] = y[i-1] + dy
 #
 # Fitting using Weibull distribution
-  param = curve_fit(Wweibull, x, y, [probLSmean[ils], 1], maxfev = max_iter_Weib)
-  printt('    ' + str(param))
-  [alpha_Weibull, k_Weibull] = param[0]
+  [alpha_Weibull, k_Weibull], fit_info_LS[ils] = fit_Weibull(x, y, [probLSmean[ils]/100, 1])
   parameters_Weibull_LS[ils] = [alpha_Weibull, k_Weibull]
+  model_selection_LS[ils] = fit_candidates(x, 0, 1, [alpha_Weibull, k_Weibull])
   printt('    alpha_Weibull : ' + str(alpha_Weibull))
   printt('    k_Weibull : ' + str(k_Weibull))
   printt(' ')
@@ -1625,7 +2384,6 @@ printt('-------------------------------------------')
 printt(' Probabilities of the LSs...')
 printt('-------------------------------------------')
 #
-xWeib   = np.arange(0, 120, 0.005)
 ymaxtot = 0
 ymin  = 0
 ymax  = 1.01
@@ -1653,7 +2411,7 @@ for ils in range(0, K):
   axs[panels[ils][0], panels[ils][1]].plot([xmean[ils], xmean[ils]], [ymin, ymaxx], lw = LS_mean_width, color = LS_color[ils], ls = LS_mean_line)
   axs[panels[ils][0], panels[ils][1]].fill_between([xmean[ils]-dxmean[ils], xmean[ils]+dxmean[ils]],  [ymin, ymaxx], color = LS_color[ils], alpha = LS_mean_alpha )
 #
-  y, x, _= axs[panels[ils][0], panels[ils][1]].hist(x, bins=20, color = LS_color[ils], alpha = LS_hist_alpha)
+  y, x, _= plot_histogram(axs[panels[ils][0], panels[ils][1]], histograms['LS'], ils, color = LS_color[ils], alpha = LS_hist_alpha)
   ymax = y.max()
 #
   ymax = y.max()
@@ -1661,8 +2419,14 @@ for ils in range(0, K):
     ymaxtot = ymax
 #
 # Probability distribution for Weibull function (scaled)
-  factor = ymax / Pweibull(alpha_Weibull, alpha_Weibull, k_Weibull)
-  axs[panels[ils][0], panels[ils][1]].plot(xWeib,factor*Pweibull(xWeib, alpha_Weibull, k_Weibull) , lw = LS_W_width,   color = LS_color[ils], ls = LS_line[0])  
+# or kernel density estimate
+  if ( density_estimate == 'KDE' ):
+    xKDE, PKDE = kde_overlay(histograms['LS'], ils, histograms['LS'])
+    axs[panels[ils][0], panels[ils][1]].plot(xKDE, PKDE, lw = LS_W_width,   color = LS_color[ils], ls = LS_line[0])
+  else:
+    factor = ymax / Pweibull(alpha_Weibull, alpha_Weibull, k_Weibull)
+    xWeib, PWeib = adaptive_grid(lambda x: Pweibull(x, alpha_Weibull, k_Weibull), 0, 20)
+    axs[panels[ils][0], panels[ils][1]].plot(xWeib, factor*PWeib, lw = LS_W_width,   color = LS_color[ils], ls = LS_line[0])  
   #LS_line[ils])  
 #
   axs[panels[ils][0], panels[ils][1]].tick_params(axis='both', which='major', labelsize=ticksize)
@@ -1977,6 +2741,10 @@ for i  in range(0,L):
     prob[i,j]  = cos * cos * 100
 printt('-------------------------------------------')
 printt(' Projections of data on eigenvectors done!')
+#
+# Histograms of the projections (20 bins between the
+# smallest and the largest projection on each PC)
+histogram_counts('PC', proj, uniform_edges(proj.min(axis=0), proj.max(axis=0), 20))
 printt('-------------------------------------------')
 printt(' ')
 #---------------------------------------------------
@@ -1986,28 +2754,25 @@ printt(' and probabilities...')
 printt('-------------------------------------------')
 printt(' ')
 # Mean values of the projections (they must zero)
-projmean = np.array([np.mean(proj[:,0]), np.mean(proj[:,1]), np.mean(proj[:,2]), np.mean(proj[:,3])])
+# (the projections are bounded by the largest distance between
+# the mean and the corners of the hypercube of possible scores)
+proj_bound = np.sqrt(np.sum(np.maximum(np.asarray(xmean), 20-np.asarray(xmean))**2))
+statistics_proj = descriptive_statistics(proj, quantile_sketch('proj', proj, -proj_bound*np.ones(K), proj_bound*np.ones(K)))
+projmean = statistics_proj['mean']
 printt('  The mean values of the projections must nullify')
 printt('    projmean : ' + str(projmean))
 printt(' ')
 printt('  Uncertainty associated with the mean values of the projections')
-uncert_abs_proj = [0, 0, 0, 0]
-for j in range(0,K):
-  projj = proj[:,j]
-  confidence_interval_proj=st.t.interval(confidence=0.95, df=len(projj)-1, loc=projmean[j], scale=st.sem(projj))  
-  uncert_abs_proj[j]=0.5*(confidence_interval_proj[1]-confidence_interval_proj[0])
+uncert_abs_proj = statistics_proj['uncert']
 #
 printt('    Uncert(proj) : ' + str(uncert_abs_proj))
 printt(' ')
 #---------------------------------------------------
 # Mean values and uncertainties of the probabilities
-probmean = np.array([np.mean(prob[:,0]), np.mean(prob[:,1]), np.mean(prob[:,2]), np.mean(prob[:,3])])
+statistics_prob = descriptive_statistics(prob)
+probmean = statistics_prob['mean']
 #
-uncert_abs_prob = [0, 0, 0, 0]
-for j in range(0,K):
-  probj = prob[:,j]
-  confidence_interval_prob=st.t.interval(confidence=0.95, df=len(probj)-1, loc=probmean[j], scale=st.sem(probj)) 
-  uncert_abs_prob[j]=0.5*(confidence_interval_prob[1]-confidence_interval_prob[0])
+uncert_abs_prob = statistics_prob['uncert']
 #
 printt('  The mean values of the corresponding probabilities')
 printt('  do not nullify (as all of them are positive or zero)')
@@ -2056,10 +2821,58 @@ printt('-------------------------------------------')
 printt(' Computation of the PRs...')
 printt('-------------------------------------------')
 printt(' ')
+def participation_family(C, orders = renyi_orders):
+# This subroutine returns, in a single vectorized pass, the
+# participation ratio (PR), the inverse participation ratio
+# (IPR), the Shannon entropy and the Renyi entropies of
+# orders q of the normalized squared coefficients
+#
+# p_j = C_j^2/\sum C_j^2
+#
+# of each row (last axis) of C, for any basis set:
+#
+# IPR = \sum p_j^2,  PR = 1/IPR = (\sum C_j^2)^2/\sum C_j^4
+#
+# H   = -\sum p_j log(p_j)
+#
+# H_q = log(\sum p_j^q)/(1-q)   (H_1 = H, H_2 = log(PR))
+#
+# Notice that the PR may equal 0 when all coefficients
+# nullify. Then, we impose a value equal to 1 (and
+# entropies equal to 0).
+  C    = np.asarray(C, dtype=float)
+  p2   = C * C
+  sum2 = p2.sum(axis=-1, keepdims=True)
+  p    = np.zeros_like(p2)
+  np.divide(p2, sum2, out=p, where=(sum2 > 0))
+  nonzero = (p > 0)
+#
+  ipr = np.sum(p*p, axis=-1)
+  ipr[ipr == 0] = 1
+  logp = np.zeros_like(p)
+  np.log(p, out=logp, where=nonzero)
+  shannon = -np.sum(p*logp, axis=-1)
+#
+# All the orders q at once: (..., n_orders, K)
+  q  = np.asarray(orders, dtype=float)
+  pq = np.zeros(p.shape[:-1] + (len(q),) + p.shape[-1:])
+  np.power(p[..., None, :], q[:, None], out=pq, where=nonzero[..., None, :])
+  sumq  = pq.sum(axis=-1)
+  renyi = np.zeros_like(sumq)
+  np.divide(np.log(np.where(sumq > 0, sumq, 1)), 1 - q, out=renyi, where=(q != 1))
+  renyi[..., q == 1] = shannon[..., None]
+  return {'PR': 1/ipr, 'IPR': ipr, 'Shannon': shannon, 'Renyi': renyi}
+#
+def participation_columns(family, basis):
+# Names and values of the columns of the entropies returned
+# by participation_family for the basis set basis
+  names  = ['Shannon (' + basis + ')'] + ['Renyi q=' + str(q) + ' (' + basis + ')' for q in renyi_orders]
+  values = np.column_stack([family['Shannon'], family['Renyi']])
+  return names, values
+#
 # Participation ratios in the original LS basis set
 # (column 0) and in the basis set formed by the
 # covariance eigenvectors (column 1)
-pr   = np.zeros((L,2))
 #
 # Notice that the PRs for a state with coefficientes C_i
 # are defined as
@@ -2074,43 +2887,23 @@ pr   = np.zeros((L,2))
 #
 #  1 <= PR <= N.
 #
-# Notice that PR may equal 0 when all coefficients
-# nullify. Then, we impose a value equal to 1.
-#
-for i  in range(0,L):
 # LSs basis set
 # (activist, reflector, theorist, pragmatist)
-  sum2 = 0.0
-  sum4 = 0.0
-  for j  in range(0,K):
-    p2   = data[i, j] * data[i, j]
-    sum2 = sum2 + p2
-    sum4 = sum4 + p2 * p2
-#
-  if( p2 == 0):
-#   We impose that the PR equals 1
-    pr[i,0] = 1 # 0
-  else:
-    pr[i,0] = sum2 * sum2 / sum4
-#
+participation_LS = participation_family(data)
 # Basis set formed by the eigenfunctions
-  sum2 = 0.0
-  sum4 = 0.0
-  for j  in range(0,K):
-    p2   = proj[i, j] * proj[i, j]
-    sum2 = sum2 + p2
-    sum4 = sum4 + p2 * p2
+participation_PC = participation_family(proj)
+pr = np.column_stack([participation_LS['PR'], participation_PC['PR']])
 #
-  if( p2 == 0):
-#   We impose that the PR equals 1
-    pr[i,1] = 1 # 0
-  else:
-    pr[i,1] = sum2 * sum2 / sum4
+entropy_labels_LS, entropy_LS = participation_columns(participation_LS, 'LS')
+entropy_labels_PC, entropy_PC = participation_columns(participation_PC, 'PC')
 #
 #printt('  pr : ', pr)
 #printt(' ')
 printt('-------------------------------------------')
 printt(' Computation of the PRs done!')
+#
+# Histograms of the PRs (15 bins from 1 to K)
+histogram_counts('PR', pr, uniform_edges(np.ones(2), K*np.ones(2), 15))
 printt('-------------------------------------------')
 printt(' ')
 #---------------------------------------------------
@@ -2118,17 +2911,25 @@ printt('-------------------------------------------')
 printt(' Mean value and uncertainties of the PRs...')
 printt('-------------------------------------------')
 printt(' ')
-prmean = [ np.mean(pr[:,0]), np.mean(pr[:,1])]
-#
-confidence_interval_pr0=st.t.interval(confidence=0.95, df=len(pr[:,0])-1, loc=np.mean(pr[:,0]), scale=st.sem(pr[:,0])) 
-uncert_abs_pr0    =0.5*(confidence_interval_pr0[1]-confidence_interval_pr0[0])
+statistics_pr = descriptive_statistics(pr, quantile_sketch('PR', pr, np.ones(2), K*np.ones(2)))
+prmean = statistics_pr['mean']
 #
-confidence_interval_pr1=st.t.interval(confidence=0.95, df=len(pr[:,1])-1, loc=np.mean(pr[:,1]), scale=st.sem(pr[:,1])) 
-uncert_abs_pr1    =0.5*(confidence_interval_pr1[1]-confidence_interval_pr1[0])
-#
-uncert_abs_pr = [ uncert_abs_pr0, uncert_abs_pr1 ]
+uncert_abs_pr = statistics_pr['uncert']
+quartiles_pr  = statistics_pr['quartiles']
 printt('  prmean     : ' + str(prmean))
 printt('  Uncert(PR) : ' + str(uncert_abs_pr))
+printt('  Quartiles (Q1, median, Q3) of the PRs (quantile sketches)')
+printt('    LS : ' + str(quartiles_pr[:,0]))
+printt('    PC : ' + str(quartiles_pr[:,1]))
+printt('  Quartiles of the projections : ' + str(statistics_proj['quartiles']))
+printt('  Quartiles of probLS          : ' + str(statistics_probLS['quartiles']))
+#
+# Entropies of the normalized squared coefficients
+entropy_labels = entropy_labels_LS + entropy_labels_PC
+entropy_all    = np.column_stack([entropy_LS, entropy_PC])
+statistics_entropy = descriptive_statistics(entropy_all)
+for j in range(0,len(entropy_labels)):
+  printt('  ' + entropy_labels[j] + ' : ' + str(statistics_entropy['mean'][j]) + ' +- ' + str(statistics_entropy['uncert'][j]))
 printt(' ')
 printt('-------------------------------------------')
 printt(' Mean value and uncertainties of PRs done!')
@@ -2149,7 +2950,8 @@ fig, ax = plt.subplots(figsize = ( w_fig, h_fig )) #, layout='constrained')
 ymaxx   = 10000000000
 #
 parameters_Weibull_PR = np.zeros((K,2))
-xWeib   = np.arange(1, 4.1, 0.001)
+fit_info_PR           = [None] * 2
+model_selection_PR    = [None] * 2
 #
 for ipr in range(0, 2):
 # printt('  ipr : ', ipr)
@@ -2191,12 +2993,9 @@ for ipr in range(0, 2):
         xc[i] = x[j]
 #
 # Fitting using Weibull distribution
-  param = curve_fit(Wweibull, x, y, [prmean[ipr], 1], maxfev = max_iter_Weib)
-# printt('  ', param)
-# printt(' ')
-  [alpha_Weibull, k_Weibull] = param[0]
-  pcov = param[1]
+  [alpha_Weibull, k_Weibull], fit_info_PR[ipr] = fit_Weibull(x, y, [prmean[ipr], 1])
   parameters_Weibull_PR[ipr] = [alpha_Weibull, k_Weibull]
+  model_selection_PR[ipr] = fit_candidates(x, 1, K, [alpha_Weibull, k_Weibull])
   printt('  alpha_Weibull : ' + str(alpha_Weibull))
   printt('  k_Weibull : ' + str(k_Weibull))
   printt(' ')
@@ -2226,7 +3025,8 @@ for ipr in range(0, 2):
 # Plot cumulative distribution and Weibull fitting function
 #
   ax.plot(x2, y2,                                 lw = PR_W_width, color = PR_color[ipr], ls = PR_line[ipr])
-  ax.plot(xWeib,Wweibull(xWeib, alpha_Weibull, k_Weibull) , lw = PR_W_width, color = PR_color[ipr], ls = PR_line[ipr])  
+  xWeib, WWeib = adaptive_grid(lambda x: Wweibull(x, alpha_Weibull, k_Weibull), 1, 4)
+  ax.plot(xWeib, WWeib, lw = PR_W_width, color = PR_color[ipr], ls = PR_line[ipr])  
 #
 # Plot the average value as a vertical line
   ax.plot([prmean[ipr], prmean[ipr]], [ymin, ymax], lw = PR_mean_width, color = PR_color[ipr], ls = PR_mean_line)
@@ -2248,7 +3048,6 @@ printt('-------------------------------------------')
 #
 fig, ax = plt.subplots(figsize = ( w_fig, h_fig )) #, layout='constrained')
 #
-xWeib   = np.arange(0.8, 4.2, 0.001)
 xmaxtot = 0
 ymaxtot = 0
 ymaxx   = 10000000000
@@ -2268,7 +3067,7 @@ for ipr in range(0, 2):
   ax.set_xlabel(Label_PR[ipr], fontsize = labelsize_PR)
   ax.set_ylabel('P [PR]',      fontsize = labelsize_PR)
 #
-  y, x, _= ax.hist(x, bins=15, color = PR_color[ipr], alpha = PR_alpha) # We create a histogram with 15 blocks instead of just bins=10
+  y, x, _= plot_histogram(ax, histograms['PR'], ipr, color = PR_color[ipr], alpha = PR_alpha) # We create a histogram with 15 blocks instead of just bins=10
   xmax = x.max()
   if xmax > xmaxtot:
     xmaxtot = xmax
@@ -2279,14 +3078,24 @@ for ipr in range(0, 2):
 #
 # Probability distribution for Weibull function, scaled
 # in such a way that its maximum coincides with that of the histogram
+# (or kernel density estimate)
   [alpha_Weibull, k_Weibull] = parameters_Weibull_PR[ipr]
-  factor = ymax / Pweibull(alpha_Weibull, alpha_Weibull, k_Weibull)
-  ax.plot(xWeib,factor*Pweibull(xWeib, alpha_Weibull, k_Weibull) , lw = PR_W_width,   color = PR_color[ipr], ls = PR_line[ipr])  
+  if ( density_estimate == 'KDE' ):
+    xKDE, PKDE = kde_overlay(sketches['PR'], ipr, histograms['PR'])
+    ax.plot(xKDE, PKDE, lw = PR_W_width,   color = PR_color[ipr], ls = PR_line[ipr])
+  else:
+    factor = ymax / Pweibull(alpha_Weibull, alpha_Weibull, k_Weibull)
+    xWeib, PWeib = adaptive_grid(lambda x: Pweibull(x, alpha_Weibull, k_Weibull), 1, K)
+    ax.plot(xWeib, factor*PWeib, lw = PR_W_width,   color = PR_color[ipr], ls = PR_line[ipr])  
 #
 # Plot the average value as a vertical line
   plt.fill_between([prmean[ipr]-uncert_abs_pr[ipr], prmean[ipr]+uncert_abs_pr[ipr]], [ymin, ymaxx], color = PR_color[ipr], alpha = PR_mean_alpha )
   ax.plot([prmean[ipr], prmean[ipr]], [ymin, ymaxx], lw = PR_mean_width, color = PR_color[ipr], ls = PR_mean_line)
 #
+# Plot the quartiles as vertical lines
+  for iq in range(0,3):
+    ax.plot([quartiles_pr[iq,ipr], quartiles_pr[iq,ipr]], [0, ymax], lw = quartile_width, color = PR_hist_quartile_color[ipr], ls = quartile_line, alpha = PR_hist_quartile_alpha)
+#
 # Plotting limits 
 ymax = ymaxtot * 1.05
 ax.set_xlim( [ 0.99, 4.01] )
@@ -2316,6 +3125,510 @@ printt(' ')
 #
 #
 #
+
+#===================================================
+# BOOTSTRAP CONFIDENCE INTERVALS
+#===================================================
+printt('===========================================')
+printt('BOOTSTRAP CONFIDENCE INTERVALS...')
+printt('===========================================')
+printt(' ')
+# The students are resampled with replacement n_bootstrap times.
+# The resamples are generated as matrices of indexes and
+# evaluated in vectorized batches (covariance matrices and
+# eigensystems of the whole batch at once). The batches are
+# distributed among n_workers threads, each one with its own
+# stream of random numbers derived from bootstrap_seed, so that
+# the results do not depend on the number of threads.
+# The eigenvectors of each replicate are aligned with the
+# reference solution (eigenVectors): they are first reordered
+# to maximize their overlap with the reference eigenvectors,
+# and their signs are then chosen to give positive overlaps.
+#
+# All the possible orderings of the K eigenvectors
+permutations_K = np.array(list(itertools.permutations(range(0,K))))
+#
+def align_eigenvectors(values, vectors, reference):
+# values (nb, K) and vectors (nb, K, K) of nb replicates
+  overlap = np.abs(np.einsum('bli,lj->bij', vectors, reference))
+  score   = overlap[:, permutations_K, np.arange(K)].sum(axis=2)
+  order   = permutations_K[np.argmax(score, axis=1)]
+  values  = np.take_along_axis(values, order, axis=1)
+  vectors = np.take_along_axis(vectors, order[:, None, :], axis=2)
+  sign = np.sign(np.einsum('bli,li->bi', vectors, reference))
+  sign[sign == 0] = 1
+  return values, vectors * sign[:, None, :]
+#
+def bootstrap_batch(seed_sequence, nb):
+  rng   = np.random.default_rng(seed_sequence)
+  index = rng.integers(0, L, size=(nb, L))
+#
+# Covariance matrices and eigensystems of the replicates
+  X  = data[index]
+  dX = X - X.mean(axis=1, keepdims=True)
+  cov = np.einsum('bli,blj->bij', dX, dX) / (L-1)
+  values, vectors = np.linalg.eigh(cov)
+  values, vectors = align_eigenvectors(values, vectors, eigenVectors)
+#
+  dispersion = 100 * np.cumsum(values, axis=1) / values.sum(axis=1, keepdims=True)
+  percentage = 100 * vectors * vectors
+#
+# Mean PRs in the LS and in the PC basis sets
+  p2   = np.einsum('bli,bij->blj', dX, vectors)**2
+  sum2 = p2.sum(axis=2)
+  sum4 = (p2*p2).sum(axis=2)
+  prPC = np.ones((nb, L))
+  np.divide(sum2*sum2, sum4, out=prPC, where=(sum4 > 0))
+  prmean_batch = np.stack([pr[index, 0].mean(axis=1), prPC.mean(axis=1)], axis=1)
+#
+  return values, dispersion, percentage, prmean_batch
+#
+def confidence_interval(samples):
+# Percentile confidence intervals (lower and upper limits)
+  return np.percentile(samples, [50 - 50*confidence_level, 50 + 50*confidence_level], axis=0)
+#
+printt('  n_bootstrap : ' + str(n_bootstrap))
+printt('  Seed        : ' + str(bootstrap_seed))
+printt('  Threads     : ' + str(n_workers))
+start = time.perf_counter()
+#
+batch_size  = max(1, min(n_bootstrap, batch_elements_max // (L*K)))
+batch_sizes = [batch_size] * (n_bootstrap // batch_size)
+if ( n_bootstrap % batch_size > 0 ):
+  batch_sizes.append(n_bootstrap % batch_size)
+seed_sequences = np.random.SeedSequence(bootstrap_seed).spawn(len(batch_sizes))
+#
+with ThreadPoolExecutor(max_workers = n_workers) as executor:
+  batches = list(executor.map(bootstrap_batch, seed_sequences, batch_sizes))
+#
+eigenValues_boot = np.concatenate([batch[0] for batch in batches])
+dispersion_boot  = np.concatenate([batch[1] for batch in batches])
+eigenVectors_percentage_boot = np.concatenate([batch[2] for batch in batches])
+prmean_boot      = np.concatenate([batch[3] for batch in batches])
+#
+eigenValues_CI  = confidence_interval(eigenValues_boot)
+dispersion_CI   = confidence_interval(dispersion_boot)
+eigenVectors_percentage_CI = confidence_interval(eigenVectors_percentage_boot)
+prmean_CI       = confidence_interval(prmean_boot)
+#
+printt('  Batches     : ' + str(len(batch_sizes)) + ' (' + str(batch_size) + ' replicates each)')
+printt('  Time (s)    : ' + str(round(time.perf_counter() - start, 3)))
+printt(' ')
+printt('  eigenValues (lower limit)    : ' + str(eigenValues_CI[0]))
+printt('  eigenValues (upper limit)    : ' + str(eigenValues_CI[1]))
+printt('  % Dispersion (lower limit)   : ' + str(dispersion_CI[0]))
+printt('  % Dispersion (upper limit)   : ' + str(dispersion_CI[1]))
+printt('  eigenVectors % (lower limit) : ' + str(eigenVectors_percentage_CI[0]))
+printt('  eigenVectors % (upper limit) : ' + str(eigenVectors_percentage_CI[1]))
+printt('  prmean (lower limit)         : ' + str(prmean_CI[0]))
+printt('  prmean (upper limit)         : ' + str(prmean_CI[1]))
+printt(' ')
+printt('===========================================')
+printt('BOOTSTRAP CONFIDENCE INTERVALS DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
+
+#===================================================
+# LEAVE-ONE-OUT INFLUENCE OF EACH STUDENT
+#===================================================
+printt('===========================================')
+printt('LEAVE-ONE-OUT INFLUENCE...')
+printt('===========================================')
+printt(' ')
+# Influence of each student on the principal components.
+# Removing student i from the data changes the covariance matrix
+# by a rank-one downdate,
+#
+#   (L-2) covX_i = (L-1) covX - L/(L-1) d_i d_i^T,
+#
+# with d_i = x_i - xmean, so that the covariance matrices of
+# all the L leave-one-out data sets are obtained at once, without
+# recomputing the means or the whole covariance matrix, and
+# their eigensystems are computed in a single batched call.
+# The influence of each student is given by the relative change
+# of the eigenvalues (in %) and by the angle (in degrees) between
+# the eigenvectors with and without the student.
+if ( L > K + 1 ):
+  cov_loo = ( (L-1) * covX[None,:,:] - L/(L-1) * np.einsum('li,lj->lij', ddata, ddata) ) / (L-2)
+  eigenValues_loo, eigenVectors_loo = np.linalg.eigh(cov_loo)
+  eigenValues_loo, eigenVectors_loo = align_eigenvectors(eigenValues_loo, eigenVectors_loo, eigenVectors)
+#
+  influence_eigenValues = 100 * (eigenValues_loo - eigenValues) / eigenValues
+  cos_loo = np.clip(np.einsum('lij,ij->lj', eigenVectors_loo, eigenVectors), -1, 1)
+  influence_angles = np.degrees(np.arccos(cos_loo))
+else:
+  printt('  Not enough students for the leave-one-out analysis')
+  influence_eigenValues = np.full((L,K), np.nan)
+  influence_angles      = np.full((L,K), np.nan)
+#
+# Most influential students on PC0 and PC1
+n_influence_print = min(L, 5)
+for j in range(0,2):
+  printt('  Most influential students on ' + Label_PCPC[j] + ' (angle, change of the eigenvalue)')
+  for i in np.argsort(-np.nan_to_num(influence_angles[:,j]))[0:n_influence_print]:
+    printt('    ' + students[i] + '   ' + str(round(influence_angles[i,j],2)) + ' deg   ' + str(round(influence_eigenValues[i,j],2)) + ' %')
+  printt(' ')
+printt('===========================================')
+printt('LEAVE-ONE-OUT INFLUENCE DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
+
+#===================================================
+# OUTLIER SCREENING
+#===================================================
+printt('===========================================')
+printt('OUTLIER SCREENING...')
+printt('===========================================')
+printt(' ')
+# Squared Mahalanobis distance of each student from the mean,
+# obtained from the projections on the PCs and the eigenvalues of
+# the covariance matrix (no further matrix inversion is needed),
+#
+#   d2_i = sum_j proj[i,j]^2 / eigenValues[j],
+#
+# which follows a chi-square distribution with K degrees of
+# freedom for normal data. The students with p-values smaller than
+# outlier_alpha are flagged as outliers and, optionally
+# (exclude_outliers_PCA), the PCA is repeated without them.
+eigenValues_positive = eigenValues > 1e-12 * np.max(eigenValues)
+mahalanobis_d2 = np.sum(proj[:, eigenValues_positive]**2 / eigenValues[eigenValues_positive], axis=1)
+mahalanobis_p  = st.chi2.sf(mahalanobis_d2, np.sum(eigenValues_positive))
+mahalanobis_threshold = st.chi2.isf(outlier_alpha, np.sum(eigenValues_positive))
+outliers = mahalanobis_p < outlier_alpha
+#
+printt('  Threshold (d2) : ' + str(mahalanobis_threshold) + ' (alpha = ' + str(outlier_alpha) + ')')
+printt('  Outliers       : ' + str(np.sum(outliers)))
+for i in np.flatnonzero(outliers):
+  printt('    ' + students[i] + '   d2 = ' + str(round(mahalanobis_d2[i],2)) + '   p = ' + str(mahalanobis_p[i]))
+#
+# PCA without the outliers
+eigenValues_inliers = None
+if ( exclude_outliers_PCA and np.any(outliers) and np.sum(~outliers) > K ):
+  covX_inliers = np.cov(data[~outliers], rowvar=False)
+  eigenValues_inliers, eigenVectors_inliers = np.linalg.eigh(covX_inliers)
+  eigenValues_inliers, eigenVectors_inliers = align_eigenvectors(eigenValues_inliers[None,:], eigenVectors_inliers[None,:,:], eigenVectors)
+  eigenValues_inliers, eigenVectors_inliers = eigenValues_inliers[0], eigenVectors_inliers[0]
+  dispersion_inliers = 100 * np.cumsum(np.sort(eigenValues_inliers)[::-1]) / np.sum(eigenValues_inliers)
+  angles_inliers = np.degrees(np.arccos(np.clip(np.sum(eigenVectors_inliers * eigenVectors, axis=0), -1, 1)))
+  printt('  PCA without the outliers')
+  printt('    eigenValues      : ' + str(eigenValues_inliers))
+  printt('    % Dispersion     : ' + str(dispersion_inliers))
+  printt('    Angles (degrees) : ' + str(angles_inliers))
+printt(' ')
+printt('===========================================')
+printt('OUTLIER SCREENING DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
+
+#===================================================
+# NULL-MODEL EIGENVALUE SPECTRA
+#===================================================
+printt('===========================================')
+printt('NULL-MODEL EIGENVALUE SPECTRA...')
+printt('===========================================')
+printt(' ')
+# Monte-Carlo reference for the significance of the principal
+# components. Cohorts with the same number of students L are
+# simulated under two null models without correlations between
+# the learning styles:
+#   - Uncorrelated: independent normal scores with the same
+#     means and standard deviations as the data.
+#   - Permutation: the scores of each learning style are permuted
+#     independently among the students, which preserves their
+#     marginal distributions but destroys the correlations.
+# The eigenvalues of the simulated cohorts are computed in
+# vectorized batches distributed among n_workers threads (as in
+# the bootstrap), with random streams derived from null_seed.
+# The p-value of each observed eigenvalue is the fraction of
+# simulated cohorts whose eigenvalue is larger or equal.
+# The models used and their order are those of null_models.
+xstd = data.std(axis=0, ddof=1)
+#
+# Simulated cohorts (nb, L, K) of each null model
+null_generators = {
+  'Uncorrelated' : lambda rng, nb: xmean + xstd * rng.standard_normal((nb, L, K)),
+  'Permutation'  : lambda rng, nb: rng.permuted(np.broadcast_to(data, (nb, L, K)), axis=1)}
+null_descriptions = {
+  'Uncorrelated' : 'uncorrelated normal scores with the same means and standard deviations as the data',
+  'Permutation'  : 'the permutation of the scores of each learning style among the students, which preserves their distributions'}
+for model in null_models:
+  if ( model not in null_generators ):
+    printt('  Unknown null model ignored : ' + model)
+null_models = [model for model in null_models if model in null_generators]
+#
+def null_batch(seed_sequence, nb):
+  rng = np.random.default_rng(seed_sequence)
+  values = np.zeros((len(null_models), nb, K))
+  for m in range(0,len(null_models)):
+    X   = null_generators[null_models[m]](rng, nb)
+    dX  = X - X.mean(axis=1, keepdims=True)
+    cov = np.einsum('bli,blj->bij', dX, dX) / (L-1)
+    values[m] = np.linalg.eigvalsh(cov)[:, ::-1]
+  return values
+#
+printt('  n_null  : ' + str(n_null))
+printt('  Seed    : ' + str(null_seed))
+printt('  Threads : ' + str(n_workers))
+start = time.perf_counter()
+#
+batch_size  = max(1, min(n_null, batch_elements_max // (max(1, len(null_models))*L*K)))
+batch_sizes = [batch_size] * (n_null // batch_size)
+if ( n_null % batch_size > 0 ):
+  batch_sizes.append(n_null % batch_size)
+seed_sequences = np.random.SeedSequence(null_seed).spawn(len(batch_sizes))
+#
+with ThreadPoolExecutor(max_workers = n_workers) as executor:
+  batches = list(executor.map(null_batch, seed_sequences, batch_sizes))
+#
+# Eigenvalues (null model, cohort, PC) and dispersion accounted
+# by the principal components with the largest eigenvalues
+eigenValues_null = np.concatenate(batches, axis=1)
+dispersion_null  = 100 * np.cumsum(eigenValues_null, axis=2) / eigenValues_null.sum(axis=2, keepdims=True)
+dispersion_obs   = 100 * np.cumsum(eigenValues) / np.sum(eigenValues)
+#
+eigenValues_null_mean = eigenValues_null.mean(axis=1)
+eigenValues_null_CI   = confidence_interval(eigenValues_null.transpose(1,0,2))
+eigenValues_null_p    = (1 + np.sum(eigenValues_null >= eigenValues, axis=1)) / (n_null + 1)
+dispersion_null_CI    = confidence_interval(dispersion_null.transpose(1,0,2))
+dispersion_null_p     = (1 + np.sum(dispersion_null >= dispersion_obs, axis=1)) / (n_null + 1)
+#
+printt('  Time (s) : ' + str(round(time.perf_counter() - start, 3)))
+printt(' ')
+printt('  eigenValues (observed) : ' + str(eigenValues))
+for m in range(0,len(null_models)):
+  printt('  ' + null_models[m] + ' null model')
+  printt('    eigenValues (mean)        : ' + str(eigenValues_null_mean[m]))
+  printt('    eigenValues (upper limit) : ' + str(eigenValues_null_CI[1,m]))
+  printt('    p-values                  : ' + str(eigenValues_null_p[m]))
+  printt('    Sigma_1 (%) p-value       : ' + str(dispersion_null_p[m,1]))
+printt(' ')
+printt('===========================================')
+printt('NULL-MODEL EIGENVALUE SPECTRA DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
+
+#===================================================
+# PERMUTATION TESTS BETWEEN COHORTS
+#===================================================
+printt('===========================================')
+printt('PERMUTATION TESTS BETWEEN COHORTS...')
+printt('===========================================')
+printt(' ')
+# Differences between the cohorts (subfolders of the input
+# folder) in the means of the learning styles, the affinities
+# (probLS) and the participation ratios. For each pair of
+# cohorts, the students of both are pooled and their cohort
+# labels are permuted n_permutations times. Each batch of
+# permutations is a matrix of 0/1 labels (one row per permutation)
+# so that the means of all the permutations are obtained with a
+# single matrix product. The batches are distributed among
+# n_workers threads with random streams derived from
+# permutation_seed. The p-values are two-sided.
+cohort_statistics_labels = Label_LS + ['Affinity ' + Label_LS[j] for j in range(0,K)] + Label_PR
+cohort_statistics = np.hstack([data, probLS, pr])
+#
+def permutation_batch(seed_sequence, nb, Y, n_a, difference):
+# Number of permutations with differences larger or equal than
+# the observed ones (in absolute value)
+  rng = np.random.default_rng(seed_sequence)
+  n   = len(Y)
+  labels = np.zeros((nb, n))
+  labels[:, 0:n_a] = 1
+  labels = rng.permuted(labels, axis=1)
+  sum_a  = labels @ Y
+  diff   = sum_a / n_a - (Y.sum(axis=0) - sum_a) / (n - n_a)
+  return np.sum(np.abs(diff) >= np.abs(difference) * (1 - 1e-10), axis=0)
+#
+cohort_pairs = [pair for pair in itertools.combinations(range(0,n_cohorts), 2)
+                if ( np.sum(cohort_index == pair[0]) > 1 and np.sum(cohort_index == pair[1]) > 1 )]
+cohort_differences = np.zeros((len(cohort_pairs), len(cohort_statistics_labels)))
+cohort_p           = np.ones((len(cohort_pairs), len(cohort_statistics_labels)))
+#
+if ( len(cohort_pairs) > 0 ):
+  printt('  n_permutations : ' + str(n_permutations))
+  printt('  Seed           : ' + str(permutation_seed))
+  printt('  Threads        : ' + str(n_workers))
+  start = time.perf_counter()
+  seed_sequences_pairs = np.random.SeedSequence(permutation_seed).spawn(len(cohort_pairs))
+  for ip, (a, b) in enumerate(cohort_pairs):
+    Y   = np.vstack([cohort_statistics[cohort_index == a], cohort_statistics[cohort_index == b]])
+    n_a = np.sum(cohort_index == a)
+    cohort_differences[ip] = Y[0:n_a].mean(axis=0) - Y[n_a:].mean(axis=0)
+#
+    batch_size  = max(1, min(n_permutations, batch_elements_max // len(Y)))
+    batch_sizes = [batch_size] * (n_permutations // batch_size)
+    if ( n_permutations % batch_size > 0 ):
+      batch_sizes.append(n_permutations % batch_size)
+    seed_sequences = seed_sequences_pairs[ip].spawn(len(batch_sizes))
+    batch_function = functools.partial(permutation_batch, Y=Y, n_a=n_a, difference=cohort_differences[ip])
+    with ThreadPoolExecutor(max_workers = n_workers) as executor:
+      counts = sum(executor.map(batch_function, seed_sequences, batch_sizes))
+    cohort_p[ip] = (1 + counts) / (n_permutations + 1)
+#
+    printt('  ' + cohort_names[a] + ' vs ' + cohort_names[b])
+    printt('    Differences : ' + str(cohort_differences[ip]))
+    printt('    p-values    : ' + str(cohort_p[ip]))
+  printt('  Time (s) : ' + str(round(time.perf_counter() - start, 3)))
+else:
+  printt('  Less than two cohorts with more than one student: no tests')
+printt(' ')
+printt('===========================================')
+printt('PERMUTATION TESTS BETWEEN COHORTS DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
+
+#===================================================
+# COMPARISON OF THE PCAs OF THE COHORTS
+#===================================================
+printt('===========================================')
+printt('COMPARISON OF THE PCAs OF THE COHORTS...')
+printt('===========================================')
+printt(' ')
+# The PCA of each cohort is computed (in parallel) and compared
+# with that of the reference (all the students, or the cohort
+# reference_cohort). The eigenvectors of each cohort are ordered
+# and their signs chosen to match the reference eigenvectors
+# (align_eigenvectors), and the comparison is summarized by:
+#   - the eigenvalues of each cohort (aligned order) and its
+#     dispersion Sigma_1 (%) (two largest eigenvalues),
+#   - the angles between each aligned eigenvector and the
+#     reference one for PC0 and PC1,
+#   - the largest principal angle between the PC0-PC1 planes
+#     of the cohort and of the reference,
+#   - the dispersion Sigma_1 (%) of the cohort accounted by the
+#     PC0 and PC1 of the reference (cross-projection).
+def cohort_pca(c):
+# Covariance matrix and eigensystem of the cohort c
+  X = data[cohort_index == c]
+  cov = np.cov(X, rowvar=False)
+  values, vectors = np.linalg.eigh(cov)
+  return cov, values[::-1], vectors[:, ::-1]
+#
+def plane_angles(vectors, reference):
+# Largest principal angle (degrees) between the planes spanned by
+# the two first columns of vectors (nb, K, K) and of reference
+  sv = np.linalg.svd(np.einsum('bli,lj->bij', vectors[:, :, 0:2], reference[:, 0:2]), compute_uv=False)
+  return np.degrees(np.arccos(np.clip(sv[:, -1], -1, 1)))
+#
+cohort_comparison_labels = ['N'] + ['λ_' + str(j) for j in range(0,K)] + ['Σ_1(%)', 'θ_0', 'θ_1', 'θ_01', 'Σ_1 ref.(%)']
+cohort_valid = np.array([np.sum(cohort_index == c) > 1 for c in range(0,n_cohorts)])
+#
+if ( n_cohorts > 1 and np.sum(cohort_valid) > 1 ):
+  with ThreadPoolExecutor(max_workers = n_workers) as executor:
+    cohort_pcas = list(executor.map(cohort_pca, np.arange(n_cohorts)[cohort_valid]))
+  cov_cohorts          = np.array([pca[0] for pca in cohort_pcas])
+  eigenValues_cohorts  = np.array([pca[1] for pca in cohort_pcas])
+  eigenVectors_cohorts = np.array([pca[2] for pca in cohort_pcas])
+  cohort_compared      = np.arange(n_cohorts)[cohort_valid]
+#
+  if ( reference_cohort in cohort_names[cohort_compared] ):
+    ireference = list(cohort_names[cohort_compared]).index(reference_cohort)
+    eigenValues_reference  = eigenValues_cohorts[ireference]
+    eigenVectors_reference = eigenVectors_cohorts[ireference]
+    reference_name = reference_cohort
+  else:
+    eigenValues_reference  = eigenValues
+    eigenVectors_reference = eigenVectors
+    reference_name = 'All the students'
+#
+  eigenValues_cohorts, eigenVectors_cohorts = align_eigenvectors(eigenValues_cohorts, eigenVectors_cohorts, eigenVectors_reference)
+  cos_cohorts = np.clip(np.einsum('bij,ij->bj', eigenVectors_cohorts, eigenVectors_reference), -1, 1)
+  variance_reference = np.einsum('li,blm,mi->bi', eigenVectors_reference, cov_cohorts, eigenVectors_reference)
+#
+# Comparison matrix (one row per cohort, plus the reference)
+  cohort_comparison = np.zeros((len(cohort_compared)+1, len(cohort_comparison_labels)))
+  cohort_comparison[0:-1,0]     = [np.sum(cohort_index == c) for c in cohort_compared]
+  cohort_comparison[0:-1,1:K+1] = eigenValues_cohorts
+# Sigma_1 (%) from the two largest eigenvalues of the cohort
+# (not from the aligned PC0 and PC1)
+  cohort_comparison[0:-1,K+1]   = 100 * np.sort(eigenValues_cohorts, axis=1)[:, ::-1][:, 0:2].sum(axis=1) / eigenValues_cohorts.sum(axis=1)
+  cohort_comparison[0:-1,K+2:K+4] = np.degrees(np.arccos(cos_cohorts[:, 0:2]))
+  cohort_comparison[0:-1,K+4]   = plane_angles(eigenVectors_cohorts, eigenVectors_reference)
+  cohort_comparison[0:-1,K+5]   = 100 * variance_reference[:, 0:2].sum(axis=1) / variance_reference.sum(axis=1)
+  cohort_comparison[-1,0]       = L if reference_name == 'All the students' else cohort_comparison[ireference,0]
+  cohort_comparison[-1,1:K+1]   = eigenValues_reference
+  cohort_comparison[-1,K+1]     = 100 * eigenValues_reference[0:2].sum() / eigenValues_reference.sum()
+  cohort_comparison[-1,K+5]     = cohort_comparison[-1,K+1]
+  cohort_comparison_names = list(cohort_names[cohort_compared]) + [reference_name + ' (reference)']
+#
+# Largest principal angles between the PC0-PC1 planes of all the pairs of cohorts
+  cohort_plane_angles = np.array([plane_angles(eigenVectors_cohorts, eigenVectors_cohorts[c]) for c in range(0,len(cohort_compared))])
+#
+  printt('  Reference : ' + reference_name)
+  printt('  ' + '   '.join(cohort_comparison_labels))
+  for c in range(0,len(cohort_comparison_names)):
+    printt('  ' + cohort_comparison_names[c] + ' : ' + str(np.round(cohort_comparison[c],2)))
+  printt(' ')
+  printt('  Angles between the PC0-PC1 planes of the cohorts (degrees) :')
+  printt(str(np.round(cohort_plane_angles,2)))
+else:
+  cohort_comparison = np.zeros((0, len(cohort_comparison_labels)))
+  printt('  Less than two cohorts with more than one student: no comparison')
+printt(' ')
+printt('===========================================')
+printt('COMPARISON OF THE PCAs OF THE COHORTS DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#
+#
+#
+#
 #===================================================
 #===================================================
 #
@@ -2569,6 +3882,8 @@ printt('-------------------------------------------')
 printt(' W(s) for the projections on the PCs...')
 printt('-------------------------------------------')
 parameters_Weibull_PC20 = np.zeros((K,3))
+fit_info_PC20           = [None] * K
+model_selection_PC20    = [None] * K
 
 #fig, ax = plt.subplots(figsize = ( w_fig, h_fig )) #, layout='constrained')
   
@@ -2578,8 +3893,6 @@ xmax = proj.max()
 xmin_proj_tot = xmin
 xmax_proj_tot = xmax
 
-xWeib_proj = np.arange(xmin*2.5, xmax*2.5, (xmax-xmin)/100000)
-
 for ipc in range(0, K):
   printt('   PC -20 to 20 : ' + str(ipc))
   x = proj[:, ipc]
@@ -2594,11 +3907,10 @@ for ipc in range(0, K):
     y[i] = y[i-1] + dy
 
 # Fitting using Weibull distribution
-  param = curve_fit(Wweibull, x-xmin_proj, y, [projmean[ipc]-xmin_proj, 1], maxfev = max_iter_Weib)
-
-  [alpha_Weibull, k_Weibull] = param[0]
+  [alpha_Weibull, k_Weibull], fit_info_PC20[ipc] = fit_Weibull(x-xmin_proj, y, [projmean[ipc]-xmin_proj, 1])
   theta_Weibull = xmin_proj
   parameters_Weibull_PC20[ipc] = [alpha_Weibull, k_Weibull, theta_Weibull]
+  model_selection_PC20[ipc] = fit_candidates(x, xmin_proj, x.max(), [alpha_Weibull, k_Weibull], theta_Weibull, True)
   printt('   alpha_Weibull     : ' + str(alpha_Weibull))
   printt('   k_Weibull         : ' + str(k_Weibull))
   printt('   theta_Weibull     : ' + str(theta_Weibull))
@@ -2755,8 +4067,8 @@ for ilp in range(0, 1):
 #**********************************************************************
 # SECONDARY PANELS (PROBABILITY DENSITY FUNCTIONS)
 #
-  xWeib   = np.arange(xmin, xmax, (xmax-xmin)/10000)
-  yWeib   = np.arange(ymin, ymax, (ymax-ymin)/10000)
+# (evaluated on adaptive grids within the visible ranges
+# [xmin, xmax] and [ymin, ymax])
 #
 #-------------------------------------------------------
 # Projection on the PC associated with the horizontal axis
@@ -2775,12 +4087,18 @@ for ilp in range(0, 1):
   
   ax_hor.tick_params(axis='both', which='major', labelsize=ticksize, labelbottom = False)
  
-  y, x, _= ax_hor.hist(x, bins=20, color = PC_color[ipc], alpha=0.5)
+  y, x, _= plot_histogram(ax_hor, histograms['PC'], ipc, color = PC_color[ipc], alpha=0.5)
   ymaxx = y.max()
 
 # Probability distribution for Weibull function, scaled
-  factor = ymaxx / Pweibull(alpha_Weibull, alpha_Weibull,  k_Weibull)
-  ax_hor.plot(xWeib_proj,factor*Pweibull_translated(xWeib_proj, alpha_Weibull, k_Weibull, theta_Weibull), lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0]) #, ls = PC_line[ipc])
+# (or kernel density estimate)
+  if ( density_estimate == 'KDE' ):
+    xKDE, PKDE = kde_overlay(sketches['proj'], ipc, histograms['PC'])
+    ax_hor.plot(xKDE, PKDE, lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0])
+  else:
+    factor = ymaxx / Pweibull(alpha_Weibull, alpha_Weibull,  k_Weibull)
+    xWeib, PWeib = adaptive_grid(lambda x: Pweibull_translated(x, alpha_Weibull, k_Weibull, theta_Weibull), xmin, xmax)
+    ax_hor.plot(xWeib, factor*PWeib, lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0]) #, ls = PC_line[ipc])
   
   ymaxx = ymaxx * 1.205
   ax_hor.set_ylim( [ 0, ymaxx] )   
@@ -2812,12 +4130,18 @@ for ilp in range(0, 1):
   
   ax_ver.tick_params(axis='both', which='major', labelsize=ticksize, labelleft = False)
  
-  y, x, _= ax_ver.hist(x, bins=20, color = PC_color[ipc], alpha=0.5, orientation='horizontal')
+  y, x, _= plot_histogram(ax_ver, histograms['PC'], ipc, color = PC_color[ipc], alpha=0.5, orientation='horizontal')
   ymaxx = y.max()
 
 # Probability distribution for Weibull function, scaled
-  factor = ymaxx / Pweibull(alpha_Weibull, alpha_Weibull,  k_Weibull)
-  ax_ver.plot(factor*Pweibull_translated(yWeib, alpha_Weibull, k_Weibull, theta_Weibull), yWeib, lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0]) #, ls = PC_line[ipc])
+# (or kernel density estimate)
+  if ( density_estimate == 'KDE' ):
+    yKDE, PKDE = kde_overlay(sketches['proj'], ipc, histograms['PC'])
+    ax_ver.plot(PKDE, yKDE, lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0])
+  else:
+    factor = ymaxx / Pweibull(alpha_Weibull, alpha_Weibull,  k_Weibull)
+    yWeib, PWeib = adaptive_grid(lambda x: Pweibull_translated(x, alpha_Weibull, k_Weibull, theta_Weibull), ymin, ymax)
+    ax_ver.plot(factor*PWeib, yWeib, lw = PC_W_width,   color = PC_color[ipc], ls = PC_line[0]) #, ls = PC_line[ipc])
   
   ymaxx = ymaxx * 1.20
   ax_ver.set_xlim( [ 0, ymaxx ] )    # Plot as a vertical line the origin
@@ -2847,16 +4171,858 @@ printt(' ')
 printt(' ')
 
 #===================================================
+# PCA MODEL
 #===================================================
-#===================================================
-#===================================================
-# SUMMARY REPORT
-#===================================================
-#===================================================
-# Most of the results of the analysis are
-# included in the summary report, which is saved in
-# docx and pdf formats.
-# Further information can be found in the 
+printt('===========================================')
+printt('PCA MODEL...')
+printt('===========================================')
+printt(' ')
+# The PCA of the students (mean values, eigenvalues, eigenvectors,
+# projections of the reference states and Weibull parameters) is
+# saved in output/chaea3s_model.npz. When a reference model is
+# found in reference_model_file (e.g., a model saved from a large
+# historical population), the students are also projected onto its
+# principal components without refitting: the projections, the
+# probabilities and the PRs in the PC basis set of all the students
+# are obtained with a single matrix product, which gives stable
+# axes for the comparison of different terms or classes.
+# The model also includes the norms index of the students (see
+# PERCENTILE NORMS), i.e., the sorted scores, projections and PRs,
+# and the cumulative counts of the scores when they are integers
+def save_pca_model(file_name):
+  np.savez(file_name, n_students = L, Label_LS = np.array(Label_LS),
+           xmean = xmean, eigenValues = eigenValues, eigenVectors = eigenVectors,
+           projectLS = projectLS,
+           parameters_Weibull_LS20 = parameters_Weibull_LS20,
+           parameters_Weibull_LS   = parameters_Weibull_LS,
+           parameters_Weibull_PR   = parameters_Weibull_PR,
+           parameters_Weibull_PC20 = parameters_Weibull_PC20,
+           **build_norms(data, proj, pr))
+#
+def build_norms(X, X_proj, X_pr):
+  norms = {'norms_LS'   : np.sort(X, axis=0),
+           'norms_proj' : np.sort(X_proj, axis=0),
+           'norms_pr'   : np.sort(X_pr, axis=0)}
+  if ( np.all(X == np.round(X)) and np.all(X >= 0) ):
+    counts = np.array([np.bincount(X[:,j].astype(int), minlength=21) for j in range(0,K)])
+    norms['norms_LS_cumcounts'] = np.cumsum(counts, axis=1)
+  return norms
+#
+def load_pca_model(file_name):
+  with np.load(file_name) as model_npz:
+    return {key : model_npz[key] for key in model_npz.files}
+#
+def score_pca_model(model, X):
+# Projections, probabilities (%), and PRs and entropies
+# (see participation_family) of the students X (n, K)
+# in the basis set of the principal components of the model
+  dX    = X - model['xmean']
+  proj_model = dX @ model['eigenVectors']
+  norm2 = np.sum(dX*dX, axis=1, keepdims=True)
+  prob_model = np.zeros_like(proj_model)
+  np.divide(100 * proj_model * proj_model, norm2, out=prob_model, where=(norm2 > 0))
+  participation_model = participation_family(proj_model)
+  return proj_model, prob_model, participation_model
+#
+model_file_name = output_gen + '/' + model_file
+save_pca_model(model_file_name)
+printt('  Saving ' + model_file_name)
+printt(' ')
+#
+reference_model_name = current_folder + '/' + reference_model_file
+if ( os.path.isfile(reference_model_name) ):
+  reference_model = load_pca_model(reference_model_name)
+  printt('  Reference model : ' + reference_model_name + ' (' + str(int(reference_model['n_students'])) + ' students)')
+  start = time.perf_counter()
+  proj_ref, prob_ref, participation_ref = score_pca_model(reference_model, data)
+  pr_ref = participation_ref['PR']
+  entropy_labels_ref, entropy_ref = participation_columns(participation_ref, 'PC ref.')
+  printt('  Scoring time per student (s) : ' + str((time.perf_counter() - start)/L))
+  printt('  Mean projections  : ' + str(proj_ref.mean(axis=0)))
+  printt('  Mean probabilities: ' + str(prob_ref.mean(axis=0)))
+  printt('  Mean PR           : ' + str(pr_ref.mean()))
+  printt('  Mean entropies    : ' + str(entropy_ref.mean(axis=0)))
+else:
+  reference_model = None
+  printt('  No reference model (' + reference_model_name + ')')
+printt(' ')
+printt('===========================================')
+printt('PCA MODEL DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# PERCENTILE NORMS
+#===================================================
+printt('===========================================')
+printt('PERCENTILE NORMS...')
+printt('===========================================')
+printt(' ')
+# Percentile of each student within a reference population for
+# each learning style, each projection on the PCs and the PRs.
+# The reference population is that of the reference model (when
+# it includes the norms index) or, otherwise, the students of
+# this report. The norms index is formed by the sorted reference
+# values, so that the percentiles of all the students are obtained
+# at once with searchsorted, or by the cumulative counts of the
+# (integer) scores, which are simply indexed. The percentile is
+# the percentage of reference values below the value of the
+# student, plus half of those equal to it (mid-rank).
+# The projections on the PCs and the PR in their basis set are
+# ranked in the basis set of this report (within its students);
+# with the norms of a reference model, the projections on the
+# reference PCs and their PR are also ranked within the model
+# (percentile_proj_ref and percentile_pr_ref).
+def percentile_ranks(sorted_reference, X):
+  n = sorted_reference.shape[0]
+  percentiles = np.zeros(X.shape)
+  for j in range(0,X.shape[1]):
+    below = np.searchsorted(sorted_reference[:,j], X[:,j], side='left')
+    above = np.searchsorted(sorted_reference[:,j], X[:,j], side='right')
+    percentiles[:,j] = 100 * (below + above) / (2*n)
+  return percentiles
+#
+def percentile_ranks_counts(cumcounts, X):
+  cumcounts0 = np.hstack([np.zeros((cumcounts.shape[0],1)), cumcounts])
+  Xint = np.clip(X.astype(int), 0, cumcounts.shape[1]-1)
+  below = cumcounts0[np.arange(cumcounts.shape[0]), Xint]
+  above = cumcounts0[np.arange(cumcounts.shape[0]), Xint+1]
+  return 100 * (below + above) / (2*cumcounts[:,-1])
+#
+norms_report = build_norms(data, proj, pr)
+norms_name_PC = 'students of this report'
+percentile_proj_ref = None
+percentile_pr_ref   = None
+if ( reference_model is not None and 'norms_LS' in reference_model ):
+  norms = reference_model
+  norms_name = 'reference model (' + str(int(reference_model['n_students'])) + ' students)'
+  percentile_proj_ref = percentile_ranks(norms['norms_proj'], proj_ref)
+  percentile_pr_ref   = percentile_ranks(norms['norms_pr'][:,1:2], pr_ref[:,None])[:,0]
+else:
+  norms = norms_report
+  norms_name = 'students of this report'
+#
+if ( 'norms_LS_cumcounts' in norms and scores_integer ):
+  percentile_LS = percentile_ranks_counts(norms['norms_LS_cumcounts'], data)
+else:
+  percentile_LS = percentile_ranks(norms['norms_LS'], data)
+percentile_proj = percentile_ranks(norms_report['norms_proj'], proj)
+percentile_pr   = np.column_stack([percentile_ranks(norms['norms_pr'][:,0:1], pr[:,0:1])[:,0],
+                                   percentile_ranks(norms_report['norms_pr'][:,1:2], pr[:,1:2])[:,0]])
+#
+printt('  Reference population : ' + norms_name)
+printt('  Mean percentiles (LS)   : ' + str(percentile_LS.mean(axis=0)))
+printt('  Mean percentiles (proj) : ' + str(percentile_proj.mean(axis=0)))
+printt('  Mean percentiles (PR)   : ' + str(percentile_pr.mean(axis=0)))
+if ( percentile_proj_ref is not None ):
+  printt('  Mean percentiles (proj, reference PCs) : ' + str(percentile_proj_ref.mean(axis=0)))
+printt(' ')
+printt('===========================================')
+printt('PERCENTILE NORMS DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# SIMILAR PROFILES
+#===================================================
+printt('===========================================')
+printt('SIMILAR PROFILES...')
+printt('===========================================')
+printt(' ')
+# Nearest-neighbour indexes (k-d trees) over the scores of the
+# students and over their projections on the plane PC0-PC1 (the
+# projections on the four PCs are a rotation of the scores, so they
+# give the same distances as the scores). The trees answer batched
+# k-nearest-neighbour and radius queries in sub-linear time:
+#   nearest_profiles(tree, X, k)  -> distances and indexes (n, k)
+#   profiles_within(tree, X, r)   -> indexes of the students within
+#                                    a distance r of each profile
+# When the profiles X are those of the students themselves
+# (exclude_self), each student is excluded from its own neighbours.
+tree_scores = cKDTree(data)
+tree_proj   = cKDTree(proj[:, 0:2])
+#
+def nearest_profiles(tree, X, k, exclude_self = False):
+  k = min(k, tree.n - exclude_self)
+  if ( k < 1 ):
+    return np.zeros((len(X),0)), np.zeros((len(X),0), dtype=int)
+  distances, indexes = tree.query(X, k = k + exclude_self, workers = -1)
+  distances = distances.reshape(len(X), -1)
+  indexes   = indexes.reshape(len(X), -1)
+  if ( exclude_self ):
+# Drop each student from its own list (or the farthest neighbour
+# when the student is not found among tied profiles)
+    keep = indexes != np.arange(len(X))[:, None]
+    keep[np.all(keep, axis=1), -1] = False
+    distances = distances[keep].reshape(len(X), k)
+    indexes   = indexes[keep].reshape(len(X), k)
+  return distances, indexes
+#
+def profiles_within(tree, X, r, exclude_self = False):
+  indexes = tree.query_ball_point(X, r, workers = -1)
+  if ( exclude_self ):
+    indexes = [[l for l in indexes[i] if l != i] for i in range(0,len(X))]
+  return indexes
+#
+start = time.perf_counter()
+neighbours_scores_distances, neighbours_scores = nearest_profiles(tree_scores, data, n_neighbours, exclude_self = True)
+neighbours_proj_distances,   neighbours_proj   = nearest_profiles(tree_proj, proj[:, 0:2], n_neighbours, exclude_self = True)
+similar_scores = profiles_within(tree_scores, data, similarity_radius, exclude_self = True)
+n_similar_scores = np.array([len(similar) for similar in similar_scores])
+printt('  Neighbours : ' + str(n_neighbours) + ', radius : ' + str(similarity_radius))
+printt('  Time (s)   : ' + str(round(time.perf_counter() - start, 4)))
+printt('  Mean number of students with similar profiles : ' + str(n_similar_scores.mean()))
+printt(' ')
+#
+for name, profile in ideal_profiles.items():
+  distances, indexes = nearest_profiles(tree_scores, np.array([profile], dtype=float), n_neighbours)
+  printt('  Students closest to the profile ' + name + ' ' + str(profile))
+  for d, l in zip(distances[0], indexes[0]):
+    printt('    ' + students[l] + '   ' + str(round(d,2)))
+  printt(' ')
+printt('===========================================')
+printt('SIMILAR PROFILES DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# CLUSTERING OF THE PROFILES
+#===================================================
+printt('===========================================')
+printt('CLUSTERING OF THE PROFILES...')
+printt('===========================================')
+printt(' ')
+# The profiles of the students are grouped with mini-batch k-means
+# in the space of the scores or of the projections on the PCs.
+# As the scores are integers, the students are first reduced to the
+# distinct profiles of the lattice (at most 21^4 of them) weighted
+# by their number of students, so the memory does not grow with the
+# number of students. The initial centroids are chosen with weighted
+# k-means++; then, each mini-batch of kmeans_batch profiles (drawn
+# with probabilities proportional to their weights) moves each
+# centroid towards the mean of its profiles with a learning rate
+# equal to the inverse of the number of profiles assigned so far.
+# The final centroids are the means of the profiles of each cluster,
+# interpreted as scores of the LSs (and their tendencies), and the
+# clusters are sorted by size.
+def assign_clusters(X, centroids, chunk = 65536):
+# Nearest centroid of each profile (in chunks to bound the memory)
+  labels = np.zeros(len(X), dtype=int)
+  for i0 in range(0, len(X), chunk):
+    d2 = ((X[i0:i0+chunk, None, :] - centroids[None, :, :])**2).sum(axis=2)
+    labels[i0:i0+chunk] = np.argmin(d2, axis=1)
+  return labels
+#
+def minibatch_kmeans(X, weights, k, rng):
+  p = weights / weights.sum()
+# Weighted k-means++ initialization
+  centroids = [X[rng.choice(len(X), p=p)]]
+  for c in range(1,k):
+    d2 = ((X[:, None, :] - np.array(centroids)[None, :, :])**2).sum(axis=2).min(axis=1)
+    if ( np.sum(weights*d2) > 0 ):
+      centroids.append(X[rng.choice(len(X), p=weights*d2/np.sum(weights*d2))])
+    else:
+      centroids.append(X[rng.choice(len(X), p=p)])
+  centroids = np.array(centroids, dtype=float)
+#
+  counts = np.zeros(k)
+  for iteration in range(0,kmeans_iterations):
+    batch  = X[rng.choice(len(X), size=kmeans_batch, p=p)]
+    labels = assign_clusters(batch, centroids)
+    nb     = np.bincount(labels, minlength=k)
+    sums   = np.zeros((k, X.shape[1]))
+    np.add.at(sums, labels, batch)
+    counts = counts + nb
+    moved  = nb > 0
+    shift  = (sums[moved] - nb[moved, None]*centroids[moved]) / counts[moved, None]
+    centroids[moved] = centroids[moved] + shift
+    if ( np.max(np.abs(shift), initial=0) < kmeans_tolerance ):
+      break
+  return centroids, iteration + 1
+#
+n_clusters_fit = min(n_clusters, L)
+if ( clustering_space == 'PC' ):
+  X_clustering = proj
+else:
+  X_clustering = data
+if ( clustering_space != 'PC' and scores_integer ):
+# Lattice counts: each profile is encoded as an integer in base 21
+  lattice_codes    = data.astype(int) @ (21**np.arange(K))
+  lattice_counts   = np.bincount(lattice_codes, minlength=21**K)
+  profiles_codes   = np.flatnonzero(lattice_counts)
+  profiles         = (profiles_codes[:, None] // (21**np.arange(K)) % 21).astype(float)
+  profiles_weights = lattice_counts[profiles_codes]
+  profiles_index   = np.searchsorted(profiles_codes, lattice_codes)
+else:
+  profiles, profiles_index, profiles_weights = np.unique(X_clustering, axis=0, return_inverse=True, return_counts=True)
+  profiles_index = profiles_index.reshape(-1)
+#
+start = time.perf_counter()
+centroids, kmeans_batches = minibatch_kmeans(profiles, profiles_weights.astype(float), n_clusters_fit, np.random.default_rng(kmeans_seed))
+#
+# Final centroids given by the (weighted) means of their profiles
+profiles_labels = assign_clusters(profiles, centroids)
+for c in range(0,n_clusters_fit):
+  if ( np.any(profiles_labels == c) ):
+    centroids[c] = np.average(profiles[profiles_labels == c], axis=0, weights=profiles_weights[profiles_labels == c])
+profiles_labels = assign_clusters(profiles, centroids)
+cluster_labels  = profiles_labels[profiles_index]
+#
+# Clusters sorted by size and centroids as scores of the LSs
+cluster_order  = np.argsort(-np.bincount(cluster_labels, minlength=n_clusters_fit), kind='stable')
+centroids      = centroids[cluster_order]
+cluster_labels = np.argsort(cluster_order)[cluster_labels]
+cluster_sizes  = np.bincount(cluster_labels, minlength=n_clusters_fit)
+if ( clustering_space == 'PC' ):
+  centroids_LS = xmean + centroids @ eigenVectors.T
+else:
+  centroids_LS = centroids
+centroids_LS = np.clip(centroids_LS, 0, 20)
+centroids_tendencies = [[tendency_long_name(tendency_intermediate(Label_LS[j], centroids_LS[c,j])) for j in range(0,K)] for c in range(0,n_clusters_fit)]
+cluster_inertia = np.sum((X_clustering - centroids[cluster_labels])**2) / L
+#
+printt('  Space                : ' + clustering_space)
+printt('  Distinct profiles    : ' + str(len(profiles)))
+printt('  Mini-batches         : ' + str(kmeans_batches))
+printt('  Time (s)             : ' + str(round(time.perf_counter() - start, 3)))
+printt('  Mean squared distance: ' + str(cluster_inertia))
+for c in range(0,n_clusters_fit):
+  printt('  Cluster ' + str(c) + ' (' + str(cluster_sizes[c]) + ' students) : ' + str(np.round(centroids_LS[c],2)) + ' ' + str(centroids_tendencies[c]))
+printt(' ')
+printt('===========================================')
+printt('CLUSTERING OF THE PROFILES DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# JOINT TENDENCIES
+#===================================================
+printt('===========================================')
+printt('JOINT TENDENCIES...')
+printt('===========================================')
+printt(' ')
+# Joint distribution of the tendencies (very low, low, moderate,
+# high and very high) towards the K LSs, i.e., a 5^K cube whose
+# element [t_0, t_1, t_2, t_3] gives the number of students with
+# tendencies t_j towards each LS j. The tendency of each student
+# is encoded as an integer (same limits as scatter_tendency) and the
+# cube is obtained with a single bincount over the codes of the
+# combinations. The marginals (pairs of LSs in learning_pairs, and
+# each LS as in Table 3) are sums over the cube, without scanning
+# the students again.
+n_tendencies = len(Label_tendencies)
+tendency_codes = np.array([np.searchsorted(tendency_upper_limits[Label_LS[j]], data[:,j], side='left') for j in range(0,K)]).T
+tendency_codes = np.minimum(tendency_codes, n_tendencies-1)
+tendency_cube  = np.bincount(np.ravel_multi_index(tendency_codes.T, (n_tendencies,)*K), minlength=n_tendencies**K).reshape((n_tendencies,)*K)
+#
+def tendency_marginal(cube, axes):
+  return cube.sum(axis=tuple(j for j in range(0,K) if j not in axes))
+#
+tendency_pairs = [tendency_marginal(tendency_cube, pair) for pair in learning_pairs]
+#
+# Agreement between the tendencies of each pair of LSs: fraction of
+# students with the same tendency towards both LSs, and Cramer's V
+tendency_pairs_same = np.array([100 * np.trace(pair_counts) / L for pair_counts in tendency_pairs])
+tendency_pairs_V    = np.zeros(len(learning_pairs))
+for ip, pair_counts in enumerate(tendency_pairs):
+  rows = pair_counts.sum(axis=1) > 0
+  cols = pair_counts.sum(axis=0) > 0
+  table = pair_counts[np.ix_(rows, cols)]
+  if ( min(table.shape) > 1 ):
+    chi2 = st.chi2_contingency(table, correction=False)[0]
+    tendency_pairs_V[ip] = np.sqrt(chi2 / (L * (min(table.shape) - 1)))
+#
+printt('  Marginals consistent with the tendency matrix : ' + str(np.all([np.array_equal(tendency_marginal(tendency_cube, [j]), tendency_matrix[j]) for j in range(0,K)])))
+printt('  Combinations of tendencies present : ' + str(np.count_nonzero(tendency_cube)) + ' of ' + str(tendency_cube.size))
+for ip, pair in enumerate(learning_pairs):
+  printt('  ' + Label_LS[pair[0]] + '-' + Label_LS[pair[1]] + ' : same tendency ' + str(round(tendency_pairs_same[ip],1)) + ' %, V = ' + str(round(tendency_pairs_V[ip],3)))
+#
+# Combinations of tendencies (and pairwise marginals) saved in
+# output/chaea3s_tendency_cube.csv and chaea3s_tendency_pairs.csv
+tendency_combinations = np.argwhere(tendency_cube > 0)
+tendency_cube_export = pd.DataFrame({Label_LS[j] : [Label_tendencies[t] for t in tendency_combinations[:,j]] for j in range(0,K)})
+tendency_cube_export['Students'] = tendency_cube[tuple(tendency_combinations.T)]
+tendency_cube_export['Students (%)'] = 100 * tendency_cube_export['Students'] / L
+tendency_cube_export = tendency_cube_export.sort_values('Students', ascending=False, kind='stable')
+tendency_cube_file = output_gen + '/chaea3s_tendency_cube.csv'
+tendency_cube_export.to_csv(tendency_cube_file, index=False)
+printt('  Saving ' + tendency_cube_file)
+#
+tendency_pairs_export = pd.DataFrame([[Label_LS[pair[0]], Label_LS[pair[1]], Label_tendencies[t0], Label_tendencies[t1], tendency_pairs[ip][t0,t1]]
+                                      for ip, pair in enumerate(learning_pairs) for t0 in range(0,n_tendencies) for t1 in range(0,n_tendencies)],
+                                     columns = ['LS 1', 'LS 2', 'Tendency LS 1', 'Tendency LS 2', 'Students'])
+tendency_pairs_file = output_gen + '/chaea3s_tendency_pairs.csv'
+tendency_pairs_export.to_csv(tendency_pairs_file, index=False)
+printt('  Saving ' + tendency_pairs_file)
+printt(' ')
+printt('===========================================')
+printt('JOINT TENDENCIES DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# GROUPS OF STUDENTS
+#===================================================
+printt('===========================================')
+printt('GROUPS OF STUDENTS...')
+printt('===========================================')
+printt(' ')
+# Statistics of the groups of students defined by the cohorts
+# (subfolders of the input folder) and by the variables of the
+# metadata file (course, gender, grade...). For each variable, the
+# sums over the students of each group of the scores, their squares
+# and products, the affinities, the PRs and the indicators of the
+# tendencies are obtained with a single bincount, from which the
+# means with their confidence intervals, the tendencies (%), the
+# covariance matrices and their eigenvalues (batched), and the
+# mean PRs of all the groups follow without any loop over groups.
+# All the groups are saved in one table (output/chaea3s_groups.csv).
+metadata_name = input_folder + metadata_file
+if ( os.path.isfile(metadata_name) ):
+  metadata = pd.read_csv(metadata_name, dtype=str)
+# Files listed more than once: the last line is used
+  metadata_duplicated = metadata['file'][metadata['file'].duplicated(keep='last')].unique()
+  for filei in metadata_duplicated:
+    printt('  Metadata : ' + filei + ' listed more than once (last line used)')
+  metadata = metadata.drop_duplicates('file', keep='last').set_index('file')
+  metadata = metadata.reindex(students)
+  printt('  Metadata : ' + metadata_name + ' (' + str(int(metadata.notna().any(axis=1).sum())) + ' of ' + str(L) + ' students)')
+else:
+  metadata = pd.DataFrame(index=students)
+  printt('  No metadata file (' + metadata_name + ')')
+metadata['Cohort'] = cohorts
+#
+pairs_K = [(i, j) for i in range(0,K) for j in range(i,K)]
+group_columns = np.hstack([data, data**2, probLS, pr,
+                           np.array([data[:,i]*data[:,j] for (i, j) in pairs_K]).T,
+                           (tendency_codes[:,:,None] == np.arange(n_tendencies)).reshape(L, K*n_tendencies)])
+#
+def group_statistics(keys):
+  names, index = np.unique(keys, return_inverse=True)
+  index = index.reshape(-1)
+  ng, nc = len(names), group_columns.shape[1]
+  sums = np.bincount((index[:,None]*nc + np.arange(nc)).ravel(), weights=group_columns.ravel(), minlength=ng*nc).reshape(ng, nc)
+  n = np.bincount(index, minlength=ng).astype(float)
+#
+  mean   = sums[:, 0:K] / n[:,None]
+  var    = np.maximum(sums[:, K:2*K] - n[:,None]*mean**2, 0) / np.maximum(n-1, 1)[:,None]
+  uncert = np.array([t_quantile(nk-1) if nk > 1 else np.nan for nk in n])[:,None] * np.sqrt(var / n[:,None])
+  affinity = sums[:, 2*K:3*K] / n[:,None]
+  prmean_groups = sums[:, 3*K:3*K+2] / n[:,None]
+#
+  cov = np.zeros((ng, K, K))
+  for ip, (i, j) in enumerate(pairs_K):
+    cov[:, i, j] = (sums[:, 3*K+2+ip] - n*mean[:,i]*mean[:,j]) / np.maximum(n-1, 1)
+    cov[:, j, i] = cov[:, i, j]
+  values = np.linalg.eigvalsh(cov)[:, ::-1]
+  dispersion01 = 100 * values[:, 0:2].sum(axis=1) / np.maximum(values.sum(axis=1), 1e-300)
+#
+  tendencies = 100 * sums[:, 3*K+2+len(pairs_K):].reshape(ng, K, n_tendencies) / n[:,None,None]
+  return {'names' : names, 'n' : n, 'mean' : mean, 'uncert' : uncert, 'affinity' : affinity,
+          'prmean' : prmean_groups, 'eigenValues' : values, 'dispersion01' : dispersion01,
+          'tendencies' : tendencies}
+#
+group_variables = [variable for variable in group_by if variable in metadata.columns]
+group_rows = []
+start = time.perf_counter()
+for variable in group_variables:
+  keys = metadata[variable].fillna('Unknown').astype(str).values
+  statistics_groups = group_statistics(keys)
+  if ( len(statistics_groups['names']) < 2 ):
+    continue
+  for g in range(0,len(statistics_groups['names'])):
+    row = {'Variable' : variable, 'Group' : statistics_groups['names'][g], 'Students' : int(statistics_groups['n'][g])}
+    for j in range(0,K):
+      row[Label_LS[j]] = statistics_groups['mean'][g,j]
+      row['Uncert ' + Label_LS[j]] = statistics_groups['uncert'][g,j]
+    for j in range(0,K):
+      row['Affinity ' + Label_LS[j]] = statistics_groups['affinity'][g,j]
+    for j in range(0,K):
+      for it in range(0,n_tendencies):
+        row[Label_tendencies[it] + ' ' + Label_LS[j] + ' (%)'] = statistics_groups['tendencies'][g,j,it]
+    for j in range(0,K):
+      row['eigenValue ' + Label_PCPC[j]] = statistics_groups['eigenValues'][g,j]
+    row['Sigma_1 (%)'] = statistics_groups['dispersion01'][g]
+    row[Label_PR[0]] = statistics_groups['prmean'][g,0]
+    row[Label_PR[1]] = statistics_groups['prmean'][g,1]
+    group_rows.append(row)
+groups_export = pd.DataFrame(group_rows)
+#
+printt('  Variables : ' + str(group_variables))
+printt('  Groups    : ' + str(len(groups_export)))
+printt('  Time (s)  : ' + str(round(time.perf_counter() - start, 4)))
+if ( len(groups_export) > 0 ):
+  groups_file = output_gen + '/chaea3s_groups.csv'
+  groups_export.to_csv(groups_file, index=False)
+  printt('  Saving ' + groups_file)
+printt(' ')
+printt('===========================================')
+printt('GROUPS OF STUDENTS DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# ITEM ANALYSIS (RELIABILITY)
+#===================================================
+printt('===========================================')
+printt('ITEM ANALYSIS (RELIABILITY)...')
+printt('===========================================')
+printt(' ')
+# Reliability of the items of each learning style, obtained from
+# the raw answers of the students (n, n_items) with a few matrix
+# products: the covariance matrix C of the items and the matrix
+# M (n_items, K) that assigns each item to its style give the
+# variances of the items (diag C), of the scores (M^T C M) and the
+# covariances item-score (C M), and from them
+#
+# alpha = n_k/(n_k-1) (1 - \sum var_i / var_score)  (Cronbach)
+#
+# the corrected item-total correlations (item vs. score of the
+# rest of the items of its style) and alpha if each item is deleted.
+# Alpha is also obtained for the groups of students (cohorts,
+# terms, courses... see GROUPS OF STUDENTS) with a single bincount.
+item_style = np.zeros(n_items, dtype=int)
+for k in range(0,len(items_LS)):
+  item_style[np.asarray(items_LS[k]) - 1] = k
+item_matrix = np.zeros((n_items, K))
+item_matrix[np.arange(n_items), item_style] = 1
+n_items_LS = item_matrix.sum(axis=0)
+#
+def item_statistics(X):
+  n  = len(X)
+  dX = X - X.mean(axis=0)
+  C  = dX.T @ dX / (n - 1)
+  var_items = np.diag(C)
+  var_score = np.einsum('ik,ij,jk->k', item_matrix, C, item_matrix)
+  cov_item_score = (C @ item_matrix)[np.arange(n_items), item_style]
+  sum_var = var_items @ item_matrix
+  alpha = np.full(K, np.nan)
+  np.divide(n_items_LS/(n_items_LS-1) * (var_score - sum_var), var_score, out=alpha, where=(var_score > 0))
+#
+# Rest of the items of the style of each item
+  var_rest = var_score[item_style] - 2*cov_item_score + var_items
+  r_item_total = np.full(n_items, np.nan)
+  np.divide(cov_item_score - var_items, np.sqrt(var_items * var_rest), out=r_item_total, where=(var_items * var_rest > 0))
+  n_rest = n_items_LS[item_style] - 1
+  alpha_deleted = np.full(n_items, np.nan)
+  np.divide(n_rest/(n_rest-1) * (var_rest - sum_var[item_style] + var_items), var_rest, out=alpha_deleted, where=(var_rest > 0))
+  return {'mean' : X.mean(axis=0), 'alpha' : alpha, 'r_item_total' : r_item_total, 'alpha_deleted' : alpha_deleted}
+#
+def reliability_groups(X, keys):
+# Alpha of each style for the groups of students defined by keys
+# (sums of the answers, scores and squared scores of each group)
+  names, index = np.unique(keys, return_inverse=True)
+  index = index.reshape(-1)
+  scores_X = X @ item_matrix
+  columns = np.hstack([X, scores_X, scores_X**2])
+  ng, nc = len(names), columns.shape[1]
+  sums = np.bincount((index[:,None]*nc + np.arange(nc)).ravel(), weights=columns.ravel(), minlength=ng*nc).reshape(ng, nc)
+  n = np.bincount(index, minlength=ng).astype(float)
+  nm1 = np.maximum(n-1, 1)[:,None]
+  mean_items = sums[:, 0:n_items] / n[:,None]
+  var_items  = n[:,None] * mean_items * (1 - mean_items) / nm1   # Answers 0/1
+  var_score  = (sums[:, n_items+K:] - sums[:, n_items:n_items+K]**2 / n[:,None]) / nm1
+  alpha = np.full((ng, K), np.nan)
+  np.divide(n_items_LS/(n_items_LS-1) * (var_score - var_items @ item_matrix), var_score, out=alpha, where=((var_score > 0) & (n[:,None] > 1)))
+  return names, n, alpha
+#
+answers_items = unpack_answers(answers_packed[answers_available])
+n_answers = len(answers_items)
+reliability_rows = []
+if ( n_answers > 2 ):
+  start = time.perf_counter()
+  statistics_items = item_statistics(answers_items)
+  names_all, n_all, alpha_all = reliability_groups(answers_items, np.zeros(n_answers, dtype=int))
+  reliability_rows.append({'Variable' : 'All', 'Group' : 'All', 'Students' : n_answers,
+                           **{'Alpha ' + Label_LS[j] : statistics_items['alpha'][j] for j in range(0,K)}})
+  for variable in group_variables:
+    keys = metadata[variable].fillna('Unknown').astype(str).values[answers_available]
+    names_g, n_g, alpha_g = reliability_groups(answers_items, keys)
+    if ( len(names_g) < 2 ):
+      continue
+    for g in range(0,len(names_g)):
+      reliability_rows.append({'Variable' : variable, 'Group' : names_g[g], 'Students' : int(n_g[g]),
+                               **{'Alpha ' + Label_LS[j] : alpha_g[g,j] for j in range(0,K)}})
+  printt('  Students with raw answers : ' + str(n_answers))
+  printt('  Time (s)                  : ' + str(round(time.perf_counter() - start, 4)))
+  for j in range(0,K):
+    printt('  ' + Label_LS[j] + ' : alpha = ' + str(round(statistics_items['alpha'][j],3)) + ', mean item-total r = ' + str(round(np.nanmean(statistics_items['r_item_total'][item_style == j]),3)))
+#
+  items_export = pd.DataFrame({'Item' : np.arange(1, n_items+1), 'Style' : [Label_LS[k] for k in item_style],
+                               'Mean' : statistics_items['mean'],
+                               'Item-total r (corrected)' : statistics_items['r_item_total'],
+                               'Alpha if deleted' : statistics_items['alpha_deleted']})
+  items_file = output_gen + '/chaea3s_items.csv'
+  items_export.to_csv(items_file, index=False)
+  printt('  Saving ' + items_file)
+  reliability_export = pd.DataFrame(reliability_rows)
+  reliability_file = output_gen + '/chaea3s_reliability.csv'
+  reliability_export.to_csv(reliability_file, index=False)
+  printt('  Saving ' + reliability_file)
+#
+# Principal components of the items. The counts of yes of each
+# item and of each pair of items (one product X^T X) give both
+# the Pearson correlations and the 2x2 tables (a, b, c, d) of the
+# tetrachoric correlations
+#
+# r_tet = cos(pi/(1+sqrt(ad/bc)))
+#
+# (0.5 is added to each cell to avoid empty cells). The loadings
+# of the items (eigenvectors scaled by the square root of the
+# eigenvalues) are grouped by learning style to check whether the
+# four-style structure holds.
+  if ( item_pca ):
+    start = time.perf_counter()
+    n11 = answers_items.T @ answers_items
+    n1  = np.diag(n11)
+    if ( item_correlation == 'tetrachoric' ):
+      a = n11 + 0.5
+      b = n1[:,None] - n11 + 0.5
+      c = n1[None,:] - n11 + 0.5
+      d = n_answers - n1[:,None] - n1[None,:] + n11 + 0.5
+      item_R = np.cos(np.pi / (1 + np.sqrt(a*d/(b*c))))
+    else:
+      item_cov = n11/n_answers - np.outer(n1, n1)/n_answers**2
+      item_std = np.sqrt(np.diag(item_cov))
+      item_R = np.zeros((n_items, n_items))
+      np.divide(item_cov, np.outer(item_std, item_std), out=item_R, where=(np.outer(item_std, item_std) > 0))
+    np.fill_diagonal(item_R, 1)
+#
+    n_components = min(item_pca_components, n_items - 1)
+    if ( item_pca_solver == 'truncated' ):
+      item_eigenValues, item_eigenVectors = eigsh(item_R, k=n_components, which='LA')
+    else:
+      item_eigenValues, item_eigenVectors = np.linalg.eigh(item_R)
+    order = np.argsort(item_eigenValues)[::-1][0:n_components]
+    item_eigenValues  = item_eigenValues[order]
+    item_eigenVectors = item_eigenVectors[:, order]
+# Sign: positive sum of the loadings
+    item_eigenVectors = item_eigenVectors * np.where(item_eigenVectors.sum(axis=0) < 0, -1, 1)
+    item_loadings = item_eigenVectors * np.sqrt(np.maximum(item_eigenValues, 0))
+    item_variance = 100 * item_eigenValues / np.trace(item_R)
+#
+# Mean absolute loading of the items of each style on each component
+# (K, n_components)
+    item_loadings_LS = (item_matrix.T @ np.abs(item_loadings)) / n_items_LS[:,None]
+    printt('  Item PCA (' + item_correlation + ', ' + item_pca_solver + ') time (s) : ' + str(round(time.perf_counter() - start, 4)))
+    printt('  Eigenvalues  : ' + str(item_eigenValues))
+    printt('  Variance (%) : ' + str(item_variance))
+    for j in range(0,K):
+      printt('  ' + Label_LS[j] + ' mean |loadings| : ' + str(np.round(item_loadings_LS[j],3)))
+#
+    item_loadings_export = pd.DataFrame({'Item' : np.arange(1, n_items+1), 'Style' : [Label_LS[k] for k in item_style]})
+    for ic in range(0,n_components):
+      item_loadings_export['Loading PC' + str(ic)] = item_loadings[:,ic]
+    item_loadings_file = output_gen + '/chaea3s_item_loadings.csv'
+    item_loadings_export.to_csv(item_loadings_file, index=False)
+    printt('  Saving ' + item_loadings_file)
+else:
+  printt('  Not enough students with raw answers (' + str(n_answers) + ')')
+printt(' ')
+printt('===========================================')
+printt('ITEM ANALYSIS (RELIABILITY) DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# LONGITUDINAL TRACKING
+#===================================================
+printt('===========================================')
+printt('LONGITUDINAL TRACKING...')
+printt('===========================================')
+printt(' ')
+# The students of this run with id and term are added to the
+# longitudinal store (replacing previous lines with the same id and
+# term). The students present in two consecutive terms are obtained
+# with a join on the id of the tables of both terms, and the changes
+# of their scores, tendencies and projections on the PCs (of the
+# reference model, if any, so that all the terms share the same
+# basis set) are computed for all of them at once.
+longitudinal_name = current_folder + '/' + longitudinal_file
+longitudinal_rows = []
+changes_export = pd.DataFrame()
+#
+def read_longitudinal(name):
+  if ( name.endswith('.parquet') ):
+    return pd.read_parquet(name)
+  return pd.read_csv(name, dtype={longitudinal_id : str, longitudinal_term : str})
+#
+def write_longitudinal(table, name):
+  if ( name.endswith('.parquet') ):
+    table.to_parquet(name)
+  else:
+    table.to_csv(name)
+#
+if ( (longitudinal_id in metadata.columns) and (longitudinal_term in metadata.columns) ):
+  start = time.perf_counter()
+  tracked = metadata[longitudinal_id].notna().values & metadata[longitudinal_term].notna().values
+  current = pd.DataFrame({longitudinal_id : metadata[longitudinal_id].values[tracked],
+                          longitudinal_term : metadata[longitudinal_term].values[tracked],
+                          'Student' : np.asarray(students)[tracked], 'Cohort' : np.asarray(cohorts)[tracked]})
+  for j in range(0,K):
+    current[Label_LS[j]] = data[tracked, j]
+  for j in range(0,K):
+    current['Tendency ' + Label_LS[j]] = tendency_codes[tracked, j]
+  current = current.drop_duplicates([longitudinal_id, longitudinal_term], keep='last')
+  current = current.set_index([longitudinal_id, longitudinal_term])
+#
+  if ( os.path.isfile(longitudinal_name) ):
+    longitudinal = read_longitudinal(longitudinal_name).set_index([longitudinal_id, longitudinal_term])
+    longitudinal = pd.concat([longitudinal.drop(current.index, errors='ignore'), current])
+  else:
+    longitudinal = current
+  longitudinal = longitudinal.sort_index()
+  os.makedirs(os.path.dirname(longitudinal_name), exist_ok=True)
+  write_longitudinal(longitudinal, longitudinal_name)
+  terms = sorted(longitudinal.index.get_level_values(longitudinal_term).unique())
+  if ( longitudinal_terms is not None ):
+    terms = [term for term in longitudinal_terms if term in terms] + [term for term in terms if term not in longitudinal_terms]
+  printt('  Store    : ' + longitudinal_name + ' (' + str(len(longitudinal)) + ' lines, ' + str(longitudinal.index.get_level_values(longitudinal_id).nunique()) + ' students)')
+  printt('  Terms    : ' + str(terms))
+#
+# Basis set of the projections (their changes do not depend on
+# the mean of the model)
+  if ( reference_model is not None ):
+    basis_vectors = reference_model['eigenVectors']
+  else:
+    basis_vectors = eigenVectors
+#
+  changes = []
+  for it in range(0,len(terms)-1):
+    before = longitudinal.xs(terms[it], level=longitudinal_term)
+    after  = longitudinal.xs(terms[it+1], level=longitudinal_term)
+    joined = before.join(after, how='inner', lsuffix=' before', rsuffix=' after')
+    if ( len(joined) == 0 ):
+      continue
+    scores_before = joined[[Label_LS[j] + ' before' for j in range(0,K)]].values.astype(float)
+    scores_after  = joined[[Label_LS[j] + ' after' for j in range(0,K)]].values.astype(float)
+    change = pd.DataFrame({longitudinal_id : joined.index, 'Term before' : terms[it], 'Term after' : terms[it+1]})
+    for j in range(0,K):
+      change['Change ' + Label_LS[j]] = scores_after[:,j] - scores_before[:,j]
+    for j in range(0,K):
+      change['Change tendency ' + Label_LS[j]] = (joined['Tendency ' + Label_LS[j] + ' after'].values.astype(int)
+                                                  - joined['Tendency ' + Label_LS[j] + ' before'].values.astype(int))
+    proj_change = (scores_after - scores_before) @ basis_vectors
+    for j in range(0,K):
+      change['Change proj ' + Label_PCPC[j]] = proj_change[:,j]
+    changes.append(change)
+#
+# Distribution of the changes of each pair of terms
+    statistics_change = descriptive_statistics(np.hstack([scores_after - scores_before, proj_change]))
+    row = {'Term before' : terms[it], 'Term after' : terms[it+1], 'Students' : len(joined)}
+    for j in range(0,K):
+      row['Change ' + Label_LS[j]] = statistics_change['mean'][j]
+      row['Uncert ' + Label_LS[j]] = statistics_change['uncert'][j]
+    for j in range(0,K):
+      row['Change proj ' + Label_PCPC[j]] = statistics_change['mean'][K+j]
+      row['Uncert proj ' + Label_PCPC[j]] = statistics_change['uncert'][K+j]
+    for j in range(0,K):
+      row['Tendency changed ' + Label_LS[j] + ' (%)'] = 100 * np.mean(change['Change tendency ' + Label_LS[j]].values != 0)
+    longitudinal_rows.append(row)
+    printt('  ' + terms[it] + ' -> ' + terms[it+1] + ' : ' + str(len(joined)) + ' students, mean changes ' + str(np.round(statistics_change['mean'][0:K],2)))
+#
+  if ( len(changes) > 0 ):
+    changes_export = pd.concat(changes, ignore_index=True)
+    changes_file = output_gen + '/chaea3s_changes.csv'
+    changes_export.to_csv(changes_file, index=False)
+    printt('  Saving ' + changes_file)
+  printt('  Time (s) : ' + str(round(time.perf_counter() - start, 4)))
+else:
+  printt('  No ' + longitudinal_id + ' and ' + longitudinal_term + ' columns in the metadata')
+printt(' ')
+printt('===========================================')
+printt('LONGITUDINAL TRACKING DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+# RESULTS EXPORT
+#===================================================
+printt('===========================================')
+printt('RESULTS EXPORT...')
+printt('===========================================')
+# The results for each individual student are saved
+# in output/chaea3s_results.csv (one line per student)
+results_export = pd.DataFrame({'Student' : students, 'Cohort' : cohorts})
+for variable in metadata.columns:
+  if ( variable != 'Cohort' ):
+    results_export[variable] = metadata[variable].values
+for j in range(0,K):
+  results_export[Label_LS[j]] = data[:,j]
+for j in range(0,K):
+  results_export['Tendency ' + Label_LS[j]] = [tendency_long_name(tendency_matrix_all[i][j]) for i in range(0,L)]
+for j in range(0,K):
+  results_export['probLS ' + Label_LS[j]] = probLS[:,j]
+for j in range(0,K):
+  results_export['proj ' + Label_PCPC[j]] = proj[:,j]
+for j in range(0,K):
+  results_export['prob ' + Label_PCPC[j]] = prob[:,j]
+results_export[Label_PR[0]] = pr[:,0]
+results_export[Label_PR[1]] = pr[:,1]
+for j in range(0,len(entropy_labels)):
+  results_export[entropy_labels[j]] = entropy_all[:,j]
+for j in range(0,K):
+  results_export['Influence eigenValue ' + Label_PCPC[j] + ' (%)'] = influence_eigenValues[:,j]
+for j in range(0,K):
+  results_export['Influence angle ' + Label_PCPC[j] + ' (deg)'] = influence_angles[:,j]
+for j in range(0,K):
+  results_export['Percentile ' + Label_LS[j]] = percentile_LS[:,j]
+for j in range(0,K):
+  results_export['Percentile ' + Label_PCPC[j]] = percentile_proj[:,j]
+results_export['Percentile ' + Label_PR[0]] = percentile_pr[:,0]
+results_export['Percentile ' + Label_PR[1]] = percentile_pr[:,1]
+results_export['Nearest students'] = [';'.join([students[l] for l in neighbours_scores[i]]) for i in range(0,L)]
+results_export['Nearest distances'] = [';'.join([str(round(d,2)) for d in neighbours_scores_distances[i]]) for i in range(0,L)]
+results_export['Nearest students (PC0-PC1)'] = [';'.join([students[l] for l in neighbours_proj[i]]) for i in range(0,L)]
+results_export['Similar profiles (r=' + str(similarity_radius) + ')'] = n_similar_scores
+results_export['Mahalanobis d2'] = mahalanobis_d2
+results_export['Outlier'] = outliers
+results_export['Cluster'] = cluster_labels
+results_export['Raw answers'] = answers_available
+results_export['Longstring'] = careless_longstring_values
+results_export['Even-odd consistency'] = careless_even_odd_values
+if ( reference_model is not None ):
+  for j in range(0,K):
+    results_export['proj ref. ' + Label_PCPC[j]] = proj_ref[:,j]
+  for j in range(0,K):
+    results_export['prob ref. ' + Label_PCPC[j]] = prob_ref[:,j]
+  results_export['PR (PC ref.)'] = pr_ref
+  if ( percentile_proj_ref is not None ):
+    for j in range(0,K):
+      results_export['Percentile ref. ' + Label_PCPC[j]] = percentile_proj_ref[:,j]
+    results_export['Percentile PR (PC ref.)'] = percentile_pr_ref
+  for j in range(0,len(entropy_labels_ref)):
+    results_export[entropy_labels_ref[j]] = entropy_ref[:,j]
+#
+results_file = output_gen + '/chaea3s_results.csv'
+results_export.to_csv(results_file, index=False)
+printt('  Saving ' + results_file)
+printt(' ')
+printt('===========================================')
+printt('RESULTS EXPORT DONE!')
+printt('===========================================')
+printt(' ')
+printt(' ')
+#
+#===================================================
+#===================================================
+#===================================================
+#===================================================
+# SUMMARY REPORT
+#===================================================
+#===================================================
+# Most of the results of the analysis are
+# included in the summary report, which is saved in
+# docx and pdf formats.
+# Further information can be found in the 
 # log file (output/chaea3s.log).
 #===================================================
 # File location and title
@@ -2879,6 +5045,9 @@ document.add_heading(title, level=0)
 
 document.add_paragraph('This report contains the most important results of the analysis that is conducted to unveil the learning styles that are present in the group of students under study. The analysis is based on the learning styles considered by CHAEA: active, reflector, theorists, and pragmatist. Unless otherwise stated, the uncertainties throughout the document (in parenthesis) have been obtained using a t-Student distribution with a confidence interval of 95%.')
 
+if ( n_archive > 0 ):
+  document.add_paragraph('Besides the students of the input files, '+str(n_archive)+' students of the archive of answers of previous terms ('+answers_store_file+' in the input folder) have been included in all the analyses of this report.')
+
 document.add_paragraph('The report is structured as follows. First, Section 1 is devoted to the individual and global statistical analysis. Here, the importance of the different learning styles for each individual student can be found (both quantitatively as well as qualitatively). Then, average means and confidence intervals are presented, along with the affinities and the Probability Density Functions. Second, Section 2 discusses the principal component analysis. The eigenvalues and eigenvectors of the covariance matrix are first introduced. Subsequently, the learning styles of the students in the principal components basis set is presented. Finally, a reduced dimensional representation of the data is conducted. Third, the participation ratios are finally presented in Section 3. The values for the original (active, theorist, pragmatic, and reflector) and in the principal components basis sets are listed. To conclude, a statistical analysis of the distribution of the participation ratios is performed.')
 
 # Further information in our reference
@@ -2913,7 +5082,7 @@ printt(' Table 1 with the number of points...')
 printt('-------------------------------------------')
 document.add_heading('Quantitative description of the learning styles for each individual student', level=3)
 
-document.add_paragraph('Table 1 shows the number of points (from 0 to 20) that each student gets in CHAEA for the different learning styles.')
+document.add_paragraph('Table 1 shows the number of points (from 0 to 20) that each student gets in CHAEA for the different learning styles, along with the percentile (P) of the student for each learning style within the '+norms_name+'.')
 
 # Table 1 title
 table_title = document.add_paragraph('Table 1. Points related the learning styles for each of the students.')
@@ -2922,17 +5091,19 @@ title_run = table_title.runs[0]
 title_run.bold = True
 
 # Table 1
-t = document.add_table(L+1, K+1)
+t = document.add_table(L+1, 2*K+1)
 
 # Table header
 t.cell(0,0).text = 'Student'
 for j in range(0,K):
   t.cell(0,j+1).text = Label_LS_print[j]
+  t.cell(0,K+j+1).text = 'P ' + Label_LS[j]
 
 for i in range(0,L):
   t.cell(i+1,0).text = students[i]
   for j in range(0,K):
     t.cell(i+1,j+1).text = str(data[i,j])
+    t.cell(i+1,K+j+1).text = str(round(percentile_LS[i,j],1))
     
 #t.cell(L+1,0).text = 'Average mean (Uncertainty)'
 #for j in range(0,K):
@@ -3140,6 +5311,8 @@ printt(' Figure 4 with the PDFs of the LSs...')
 printt('-------------------------------------------')
 
 document.add_paragraph('Figure 4 shows histograms with the probability distributions of the results of Table 1. The continuous lines show fittings with Weibull distributions with the parameters shown in Table 5. These fittings have been performed on the corresponding cumulative distributions given by the staircases shown in Figure 5.')
+if ( density_estimate == 'KDE' ):
+  document.add_paragraph('Note that, in this report, the continuous lines of the probability distributions of Figs. 4, 7, and 8 show kernel density estimates (Gaussian kernels with bandwidths given by Silverman\'s rule) instead of the Weibull distributions, whose parameters are still listed in Tables 5, 9, and 11.')
 
 document.add_picture(filename_statistics_ls, width=Inches(5))
 
@@ -3178,23 +5351,29 @@ printt('-------------------------------------------')
 printt(' Table 5 with the Weibull parameters for the PDFs of the LSs...')
 printt('-------------------------------------------')
 # Table title
-table_title = document.add_paragraph('Table 5. Parameters of the Weibull distributions that fit the probability distributions (histograms) shown in Figs. 4 and 5. The location parameter is set equal to θ = 0.')
+table_title = document.add_paragraph('Table 5. Parameters of the Weibull distributions that fit the probability distributions (histograms) shown in Figs. 4 and 5. The location parameter is set equal to θ = 0. The last columns give the convergence status of the fittings, the number of function evaluations, and the elapsed time. When the fitting does not converge within the evaluation or time budget, the parameters are estimated from the moments of the data.')
 table_title.alignment = 1  # Center alignment
 title_run = table_title.runs[0]
 title_run.bold = True
 
-t = document.add_table(K+1, 3)
+t = document.add_table(K+1, 6)
 
 # Table header
 t.cell(0,0).text = 'Learning style'
 t.cell(0,1).text = 'α'
 t.cell(0,2).text = 'k'
+t.cell(0,3).text = 'Status'
+t.cell(0,4).text = 'Evaluations'
+t.cell(0,5).text = 'Time (ms)'
 
 for j in range(0,K):
   t.cell(j+1,0).text = Label_LS_print[j]
   [alpha_Weibull, k_Weibull] = parameters_Weibull_LS20[j]
   t.cell(j+1,1).text = str(round(alpha_Weibull,2))
   t.cell(j+1,2).text = str(round(k_Weibull,2))
+  t.cell(j+1,3).text = fit_status_text(fit_info_LS20[j])
+  t.cell(j+1,4).text = str(fit_info_LS20[j]['nfev'])
+  t.cell(j+1,5).text = str(round(1000*fit_info_LS20[j]['time'],1))
 
 document.add_page_break()
 printt('-------------------------------------------')
@@ -3303,7 +5482,7 @@ printt(' Table 8 with the individual analysis of PCs...')
 printt('-------------------------------------------')
 document.add_heading('Quantitive description of the students in the basis set of the principal components', level=3)
 
-document.add_paragraph('Table 8 shows (as percentages) the structure of the learning styles in the basis set formed by the principal components. The table also includes the percentage of the learning styles of each student that is described by combining the two (sum of the percentages for the principal components 0 and 1) or three (sum of the percentages for the principal components 0, 1, and 2) principal components with the largest eigenvalues. Recall that when the four principal components are considered, 100% of the learning style of the student is reproduced.')
+document.add_paragraph('Table 8 shows (as percentages) the structure of the learning styles in the basis set formed by the principal components. The table also includes the percentage of the learning styles of each student that is described by combining the two (sum of the percentages for the principal components 0 and 1) or three (sum of the percentages for the principal components 0, 1, and 2) principal components with the largest eigenvalues. Recall that when the four principal components are considered, 100% of the learning style of the student is reproduced. The next columns give the influence of each student on the principal components 0 and 1, i.e., the change (in %) of the corresponding eigenvalues (Δλ_0 and Δλ_1) and the angle (in degrees) that the eigenvectors rotate (θ_0 and θ_1) when the student is removed from the data set. Large values may reveal atypical submissions. The last columns give the percentiles (P) of the projections of the student on the principal components 0 and 1 within the '+norms_name_PC+'.')
 
 # Table title
 table_title = document.add_paragraph('Table 8. Structure of the learning styles of each of the students in the basis set of principal components.')
@@ -3312,7 +5491,7 @@ title_run = table_title.runs[0]
 title_run.bold = True
 
 # Table 1
-t = document.add_table(L+1, 7)
+t = document.add_table(L+1, 13)
 
 # Table header
 t.cell(0,0).text = 'Student'
@@ -3323,6 +5502,12 @@ for j in range(0,K):
 #Σ
 t.cell(0,5).text = '0+1'
 t.cell(0,6).text = '0+1+2'
+t.cell(0,7).text = 'Δλ_0(%)'
+t.cell(0,8).text = 'Δλ_1(%)'
+t.cell(0,9).text = 'θ_0'
+t.cell(0,10).text = 'θ_1'
+t.cell(0,11).text = 'P ' + Label_PCPC[0]
+t.cell(0,12).text = 'P ' + Label_PCPC[1]
 
 for i in range(0,L):
   t.cell(i+1,0).text = students[i]
@@ -3331,6 +5516,12 @@ for i in range(0,L):
  
   t.cell(i+1,5).text = str(round(prob[i,0]+prob[i,1], 2))
   t.cell(i+1,6).text = str(round(prob[i,0]+prob[i,1]+prob[i,2], 2))   
+  t.cell(i+1,7).text = str(round(influence_eigenValues[i,0], 2))
+  t.cell(i+1,8).text = str(round(influence_eigenValues[i,1], 2))
+  t.cell(i+1,9).text = str(round(influence_angles[i,0], 2))
+  t.cell(i+1,10).text = str(round(influence_angles[i,1], 2))
+  t.cell(i+1,11).text = str(round(percentile_proj[i,0], 1))
+  t.cell(i+1,12).text = str(round(percentile_proj[i,1], 1))
 # t.cell(i+1,5).text = str(round(prob[i,0], 2))
 # t.cell(i+1,6).text = str(round(prob[i,0]+prob[i,1], 2))
 # t.cell(i+1,7).text = str(round(prob[i,0]+prob[i,1]+prob[i,2], 2))
@@ -3426,18 +5617,21 @@ printt('-------------------------------------------')
 printt(' Table 9 with the Weibull parameters for the PDFs of the PCs...')
 printt('-------------------------------------------')
 # Table title
-table_title = document.add_paragraph('Table 9. Parameters of the Weibull distributions that fit the probability distributions (histograms) of the projection of the learning styles on the principal-components basis set (see histograms in Fig. 7). The location parameter θ is set equal to the smallest projection for each component.')
+table_title = document.add_paragraph('Table 9. Parameters of the Weibull distributions that fit the probability distributions (histograms) of the projection of the learning styles on the principal-components basis set (see histograms in Fig. 7). The location parameter θ is set equal to the smallest projection for each component. The last columns give the convergence status of the fittings, the number of function evaluations, and the elapsed time.')
 table_title.alignment = 1  # Center alignment
 title_run = table_title.runs[0]
 title_run.bold = True
 
-t = document.add_table(K+1, 4)
+t = document.add_table(K+1, 7)
 
 # Table header
 t.cell(0,0).text = 'Principal component'
 t.cell(0,1).text = 'α'
 t.cell(0,2).text = 'k'
 t.cell(0,3).text = 'θ'
+t.cell(0,4).text = 'Status'
+t.cell(0,5).text = 'Evaluations'
+t.cell(0,6).text = 'Time (ms)'
 
 for j in range(0,K):
   t.cell(j+1,0).text = Label_PC[j]
@@ -3445,6 +5639,9 @@ for j in range(0,K):
   t.cell(j+1,1).text = str(round(alpha_Weibull,2))
   t.cell(j+1,2).text = str(round(k_Weibull,2))
   t.cell(j+1,3).text = str(round(theta_Weibull,2))
+  t.cell(j+1,4).text = fit_status_text(fit_info_PC20[j])
+  t.cell(j+1,5).text = str(fit_info_PC20[j]['nfev'])
+  t.cell(j+1,6).text = str(round(1000*fit_info_PC20[j]['time'],1))
 
 printt('-------------------------------------------')
 printt(' Table 9 with the Weibull parameters for the PDFs of the PCs done!')
@@ -3488,7 +5685,7 @@ printt('-------------------------------------------')
 printt(' Table 10 with the PRs...')
 printt('-------------------------------------------')
 
-document.add_paragraph('Table 10 shows the participation ratios of each individual student for CHAEA (active, theorist, pragmatic, and reflector) and for the principal-components basis sets. For the case under study, this parameter lies between 1 and 4. The smaller the participation ratio, the better.')
+document.add_paragraph('Table 10 shows the participation ratios of each individual student for CHAEA (active, theorist, pragmatic, and reflector) and for the principal-components basis sets. For the case under study, this parameter lies between 1 and 4. The smaller the participation ratio, the better. The last columns give the percentiles (P) of the participation ratios of the student within the '+norms_name+' (learning-styles basis set) and within the '+norms_name_PC+' (principal components of this report).')
 
 # Table 1 title
 table_title = document.add_paragraph('Table 10. Participation ratios of each individual student for CHAEA learning styles (LS) and for the principal-components (PC) basis sets.')
@@ -3497,17 +5694,21 @@ title_run = table_title.runs[0]
 title_run.bold = True
 
 # Table 1
-t = document.add_table(L+1, 3)
+t = document.add_table(L+1, 5)
 
 # Table header
 t.cell(0,0).text = 'Student'
 t.cell(0,1).text = 'LS'
 t.cell(0,2).text = 'PC'
+t.cell(0,3).text = 'P LS'
+t.cell(0,4).text = 'P PC'
 
 for i in range(0,L):
   t.cell(i+1,0).text = students[i]
   t.cell(i+1,1).text = str(round(pr[i,0],2))
   t.cell(i+1,2).text = str(round(pr[i,1],2))
+  t.cell(i+1,3).text = str(round(percentile_pr[i,0],1))
+  t.cell(i+1,4).text = str(round(percentile_pr[i,1],1))
   
 #t.cell(L+1,0).text = 'Average mean'
 #for j in range(0,2):
@@ -3571,18 +5772,22 @@ printt('-------------------------------------------')
 printt(' Table 11 with the average parameters for the PRs...')
 printt('-------------------------------------------')
 # Table title
-table_title = document.add_paragraph('Table 11. Average mean and corresponding uncertainty (in parenthesis) of the participation ratios for the learning-styles basis set and for the principal components. α and k are, respectively, the shape and scale parameters of the Weibull distributions the fit the probability distributions (histograms) of Fig. 8. The location parameter is set equal to θ = 0.')
+table_title = document.add_paragraph('Table 11. Average mean and corresponding uncertainty (in parenthesis) of the participation ratios for the learning-styles basis set and for the principal components. α and k are, respectively, the shape and scale parameters of the Weibull distributions the fit the probability distributions (histograms) of Fig. 8. The location parameter is set equal to θ = 0. The next columns give the convergence status of the fittings, the number of function evaluations, and the elapsed time. The last column gives the quartiles (Q1, median, and Q3), which are also shown as dotted lines in Fig. 8.')
 table_title.alignment = 1  # Center alignment
 title_run = table_title.runs[0]
 title_run.bold = True
 
-t = document.add_table(3, 4)
+t = document.add_table(3, 8)
 
 # Table header
 t.cell(0,0).text = 'Basis set'
 t.cell(0,1).text = 'Average mean (Uncertainty)'
 t.cell(0,2).text = 'α'
 t.cell(0,3).text = 'k'
+t.cell(0,4).text = 'Status'
+t.cell(0,5).text = 'Evaluations'
+t.cell(0,6).text = 'Time (ms)'
+t.cell(0,7).text = 'Quartiles'
 
 t.cell(1,0).text = 'Principal component'
 t.cell(2,0).text = 'Learning styles'
@@ -3593,6 +5798,10 @@ for j in range(0,2):
   [alpha_Weibull, k_Weibull] = parameters_Weibull_PR[j]
   t.cell(j+1,2).text = str(round(alpha_Weibull,2))
   t.cell(j+1,3).text = str(round(k_Weibull,2))
+  t.cell(j+1,4).text = fit_status_text(fit_info_PR[j])
+  t.cell(j+1,5).text = str(fit_info_PR[j]['nfev'])
+  t.cell(j+1,6).text = str(round(1000*fit_info_PR[j]['time'],1))
+  t.cell(j+1,7).text = ', '.join([str(round(quartile,2)) for quartile in quartiles_pr[:,j]])
 
 printt('-------------------------------------------')
 printt(' Table 11 with the average parameters for the PRs done!')
@@ -3601,6 +5810,650 @@ printt('-------------------------------------------')
 
 
 
+document.add_page_break()
+#===================================================
+# SECTION 4
+#===================================================
+#==================================================
+document.add_heading('4. Supplementary analyses', level=1)
+#==================================================
+
+document.add_paragraph('This section collects supplementary analyses of the learning styles, of the principal components, and of the participation ratios.')
+
+document.add_heading('4.1 Model selection for the probability distributions', level=2)
+
+printt('-------------------------------------------')
+printt(' Table 12 with the model selection...')
+printt('-------------------------------------------')
+
+document.add_paragraph('Table 12 compares Weibull distributions with normal, gamma and beta distributions fitted to the same data. The Weibull, normal and gamma distributions are maximum-likelihood fits (the Weibull parameters may thus differ slightly from those of the fittings of W(s) used in the figures), whereas the beta distributions are fitted by the method of moments. The gamma and beta distributions are defined on the range of possible values of each variable (from 0 to 20 for the learning styles, from 0 to 1 for the affinities probLS, from 1 to 4 for the participation ratios, and between the smallest and the largest projection for the principal components). The smaller the Akaike (AIC) and Bayesian (BIC) information criteria, the better the description of the data. The last column gives the distribution with the smallest BIC.')
+
+# Table title
+table_title = document.add_paragraph('Table 12. Akaike and Bayesian information criteria (AIC / BIC) of the candidate distributions for the learning styles (LS), the affinities (probLS), the principal components (PC), and the participation ratios (PR).')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+model_selection_rows   = model_selection_LS20 + model_selection_LS + model_selection_PC20 + model_selection_PR
+model_selection_labels = Label_LS + ['probLS ' + Label_LS[j] for j in range(0,K)] + Label_PCPC + Label_PR
+
+t = document.add_table(len(model_selection_rows)+1, len(candidate_distributions)+2)
+
+# Table header
+t.cell(0,0).text = 'Variable'
+for j in range(0,len(candidate_distributions)):
+  t.cell(0,j+1).text = candidate_distributions[j]
+t.cell(0,len(candidate_distributions)+1).text = 'Best (BIC)'
+
+for i in range(0,len(model_selection_rows)):
+  t.cell(i+1,0).text = model_selection_labels[i]
+  for j in range(0,len(candidate_distributions)):
+    name = candidate_distributions[j]
+    t.cell(i+1,j+1).text = str(round(model_selection_rows[i]['AIC'][name],1)) + ' / ' + str(round(model_selection_rows[i]['BIC'][name],1))
+  t.cell(i+1,len(candidate_distributions)+1).text = model_selection_rows[i]['best']
+
+printt('-------------------------------------------')
+printt(' Table 12 with the model selection done!')
+printt('-------------------------------------------')
+
+
+
+document.add_heading('4.2 Bootstrap confidence intervals', level=2)
+
+printt('-------------------------------------------')
+printt(' Tables 13 and 14 with the bootstrap confidence intervals...')
+printt('-------------------------------------------')
+
+document.add_paragraph('The confidence intervals of the eigenvalues, of the dispersion, and of the structure of the eigenvectors of the covariance matrix have been obtained by bootstrap, i.e., by resampling the students with replacement '+str(n_bootstrap)+' times and repeating the principal component analysis for each resample. The eigenvectors of each resample are matched with those of Table 7 before computing the intervals. Tables 13 and 14 give the '+str(round(100*confidence_level))+'% confidence intervals (in brackets). Likewise, the confidence intervals of the average participation ratios are ['+str(round(prmean_CI[0,0],2))+', '+str(round(prmean_CI[1,0],2))+'] for the learning-styles basis set, and ['+str(round(prmean_CI[0,1],2))+', '+str(round(prmean_CI[1,1],2))+'] for the principal components.')
+
+# Table title
+table_title = document.add_paragraph('Table 13. Eigenvalues λ_i of the covariance matrix and percentage of total dispersion Σ_i (see Table 6) with their bootstrap confidence intervals (in brackets).')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(K+1, 3)
+
+# Table header
+t.cell(0,0).text = 'Principal component (i)'
+t.cell(0,1).text = 'λ_i'
+t.cell(0,2).text = 'Σ_i(%)'
+
+for j in range(0,K):
+  t.cell(j+1,0).text = Label_PC[j]
+  t.cell(j+1,1).text = str(round(eigenValues[j],2)) + ' [' + str(round(eigenValues_CI[0,j],2)) + ', ' + str(round(eigenValues_CI[1,j],2)) + ']'
+  t.cell(j+1,2).text = str(round(100/trace_covX*np.sum(eigenValues[0:j+1]),1)) + ' [' + str(round(dispersion_CI[0,j],1)) + ', ' + str(round(dispersion_CI[1,j],1)) + ']'
+
+# Table title
+table_title = document.add_paragraph('Table 14. Structure (as percentages) of the eigenvectors of the covariance matrix in the basis set of CHAEA learning styles with their bootstrap confidence intervals (in brackets).')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(K+1, K+1)
+
+# Table header
+t.cell(0,0).text = 'Principal component'
+for i in range(0,K):
+  t.cell(0,i+1).text = Label_LS[i]
+
+for j in range(0,K):
+  t.cell(j+1,0).text = Label_PC[j]
+  for i in range(0,K):
+    t.cell(j+1,i+1).text = str(round(eigenVectors_percentage[i,j],1)) + ' [' + str(round(eigenVectors_percentage_CI[0,i,j],1)) + ', ' + str(round(eigenVectors_percentage_CI[1,i,j],1)) + ']'
+
+printt('-------------------------------------------')
+printt(' Tables 13 and 14 with the bootstrap confidence intervals done!')
+printt('-------------------------------------------')
+
+
+
+document.add_heading('4.3 Significance of the principal components', level=2)
+
+printt('-------------------------------------------')
+printt(' Table 15 with the null-model eigenvalues...')
+printt('-------------------------------------------')
+
+document.add_paragraph('The significance of the principal components has been assessed by comparing the eigenvalues of Table 6 with those of '+str(n_null)+' simulated groups of '+str(L)+' students without correlations between the learning styles. The null models considered are: '+'; '.join([null_models[m]+', '+null_descriptions[null_models[m]] for m in range(0,len(null_models))])+'. Table 15 gives the mean eigenvalues of each null model with their '+str(round(100*confidence_level))+'% intervals (in brackets) and the p-values of the observed eigenvalues, i.e., the fraction of simulated groups with larger or equal eigenvalues. A principal component is significant when its p-value is small (e.g., p<0.05). Likewise, the dispersion Σ_1(%)='+str(round(dispersion_obs[1],1))+' accounted by PC0 and PC1 is exceeded with a probability '+', '.join(['p='+str(round(dispersion_null_p[m,1],4))+' in the '+null_models[m]+' model' for m in range(0,len(null_models))])+'.')
+
+# Table title
+table_title = document.add_paragraph('Table 15. Observed eigenvalues λ_i of the covariance matrix and mean eigenvalues of the uncorrelated and permutation null models with their intervals (in brackets) and the p-values of the observed eigenvalues.')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(K+1, 2+2*len(null_models))
+
+# Table header
+t.cell(0,0).text = 'Principal component (i)'
+t.cell(0,1).text = 'λ_i'
+for m in range(0,len(null_models)):
+  t.cell(0,2+2*m).text = null_models[m]
+  t.cell(0,3+2*m).text = 'p'
+
+for j in range(0,K):
+  t.cell(j+1,0).text = Label_PC[j]
+  t.cell(j+1,1).text = str(round(eigenValues[j],2))
+  for m in range(0,len(null_models)):
+    t.cell(j+1,2+2*m).text = str(round(eigenValues_null_mean[m,j],2)) + ' [' + str(round(eigenValues_null_CI[0,m,j],2)) + ', ' + str(round(eigenValues_null_CI[1,m,j],2)) + ']'
+    t.cell(j+1,3+2*m).text = str(round(eigenValues_null_p[m,j],4))
+
+printt('-------------------------------------------')
+printt(' Table 15 with the null-model eigenvalues done!')
+printt('-------------------------------------------')
+
+# The following subsections and tables are only included when
+# the corresponding analyses apply, so they are numbered on the fly
+subsection_next = 4
+table_next      = 16
+
+
+
+
+document.add_heading('4.'+str(subsection_next)+' Outliers', level=2)
+subsection_next = subsection_next + 1
+
+printt('-------------------------------------------')
+printt(' Outliers...')
+printt('-------------------------------------------')
+
+document.add_paragraph('The students whose learning styles are far from the rest may reveal careless or implausible answers, which distort the covariance matrix. They have been screened by means of the squared Mahalanobis distance d²=Σ_j p_j²/λ_j, where p_j are the projections of the student on the principal components (see Table 8) and λ_j the eigenvalues of Table 6. A student is flagged as outlier when the probability of a larger distance (chi-square distribution with '+str(int(np.sum(eigenValues_positive)))+' degrees of freedom) is smaller than '+str(outlier_alpha)+', i.e., when d²>'+str(round(mahalanobis_threshold,2))+'. '+str(int(np.sum(outliers)))+' students have been flagged'+(': '+', '.join([students[i]+' (d²='+str(round(mahalanobis_d2[i],2))+')' for i in np.flatnonzero(outliers)])+'.' if np.any(outliers) else '.'))
+
+if ( careless_screening ):
+  document.add_paragraph('Before the analysis, the raw answers of the students have been screened for careless responses: '+str(int(careless.sum()))+' students who answered all the items in the same way, whose longest run of identical consecutive answers reached '+str(careless_longstring)+' items'+(', or whose even-odd consistency (correlation between the answers to the odd and even items of the learning styles) was below '+str(careless_even_odd) if careless_even_odd is not None else '')+' have been excluded and listed in the error file (output/figs/error_file.txt).')
+
+if ( eigenValues_inliers is not None ):
+  table_outliers = table_next
+  table_next = table_next + 1
+  document.add_paragraph('Table '+str(table_outliers)+' compares the eigenvalues of the covariance matrix with those obtained without the outliers, along with the angles (in degrees) between the corresponding principal components.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_outliers)+'. Eigenvalues λ_i of the covariance matrix with and without the outliers, and angles θ_i between the corresponding principal components.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(K+1, 4)
+
+  # Table header
+  t.cell(0,0).text = 'Principal component (i)'
+  t.cell(0,1).text = 'λ_i'
+  t.cell(0,2).text = 'λ_i (without outliers)'
+  t.cell(0,3).text = 'θ_i'
+
+  for j in range(0,K):
+    t.cell(j+1,0).text = Label_PC[j]
+    t.cell(j+1,1).text = str(round(eigenValues[j],2))
+    t.cell(j+1,2).text = str(round(eigenValues_inliers[j],2))
+    t.cell(j+1,3).text = str(round(angles_inliers[j],2))
+
+printt('-------------------------------------------')
+printt(' Outliers done!')
+printt('-------------------------------------------')
+
+
+
+if ( len(cohort_pairs) > 0 ):
+  document.add_heading('4.'+str(subsection_next)+' Comparison between cohorts', level=2)
+  subsection_next = subsection_next + 1
+  table_permutation = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_permutation)+' with the permutation tests between cohorts...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('The students have been grouped in '+str(n_cohorts)+' cohorts ('+', '.join(cohort_names)+') according to the subfolders of the input folder. Table '+str(table_permutation)+' gives the differences between the means of the learning styles, of the affinities (in %), and of the participation ratios of each pair of cohorts, along with their two-sided p-values (in brackets) obtained by permuting the cohorts of the students '+str(n_permutations)+' times. Small p-values (e.g., p<0.05) indicate significant differences between the cohorts.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_permutation)+'. Differences between the means of the learning styles, of the affinities (%), and of the participation ratios of each pair of cohorts (first minus second) with their permutation p-values (in brackets).')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(len(cohort_pairs)+1, len(cohort_statistics_labels)+1)
+
+  # Table header
+  t.cell(0,0).text = 'Cohorts'
+  for j in range(0,len(cohort_statistics_labels)):
+    t.cell(0,j+1).text = cohort_statistics_labels[j]
+
+  for ip, (a, b) in enumerate(cohort_pairs):
+    t.cell(ip+1,0).text = cohort_names[a] + ' - ' + cohort_names[b]
+    for j in range(0,len(cohort_statistics_labels)):
+      t.cell(ip+1,j+1).text = str(round(cohort_differences[ip,j],2)) + ' (' + str(round(cohort_p[ip,j],4)) + ')'
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_permutation)+' with the permutation tests between cohorts done!')
+  printt('-------------------------------------------')
+
+
+if ( len(cohort_comparison) > 0 ):
+  table_comparison = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_comparison)+' with the comparison of the PCAs of the cohorts...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('Table '+str(table_comparison)+' compares the principal components of each cohort with those of the reference ('+reference_name+'). The principal components of each cohort have been ordered and their signs chosen to match those of the reference. The table gives the eigenvalues λ_i of each cohort (in this aligned order, so that λ_0 and λ_1 are not necessarily its two largest eigenvalues), the dispersion Σ_1(%) accounted by the two principal components of the cohort with the largest eigenvalues, the angles (in degrees) between its aligned principal components 0 and 1 and those of the reference (θ_0 and θ_1), the largest angle between the planes formed by the aligned principal components 0 and 1 of the cohort and by those of the reference (θ_01), and the dispersion of the cohort accounted by the principal components 0 and 1 of the reference (Σ_1 ref.(%)). Small angles and similar values of Σ_1(%) and Σ_1 ref.(%) indicate that the reference principal components describe the cohort well.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_comparison)+'. Comparison of the principal components of the cohorts with those of the reference (last row).')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(len(cohort_comparison)+1, len(cohort_comparison_labels)+1)
+
+  # Table header
+  t.cell(0,0).text = 'Cohort'
+  for j in range(0,len(cohort_comparison_labels)):
+    t.cell(0,j+1).text = cohort_comparison_labels[j]
+
+  for c in range(0,len(cohort_comparison)):
+    t.cell(c+1,0).text = cohort_comparison_names[c]
+    t.cell(c+1,1).text = str(int(cohort_comparison[c,0]))
+    for j in range(1,len(cohort_comparison_labels)):
+      if ( c == len(cohort_comparison)-1 and j in [K+2, K+3, K+4] ):
+        t.cell(c+1,j+1).text = '-'
+      else:
+        t.cell(c+1,j+1).text = str(round(cohort_comparison[c,j],2))
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_comparison)+' with the comparison of the PCAs of the cohorts done!')
+  printt('-------------------------------------------')
+
+
+
+if ( reference_model is not None ):
+  document.add_heading('4.'+str(subsection_next)+' Projection onto the reference model', level=2)
+  subsection_next = subsection_next + 1
+  table_model = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_model)+' with the projections onto the reference model...')
+  printt('-------------------------------------------')
+
+  cos_model = np.abs(np.sum(eigenVectors * reference_model['eigenVectors'], axis=0))
+  document.add_paragraph('The students have also been projected onto the principal components of a reference model obtained from '+str(int(reference_model['n_students']))+' students, without recomputing the principal component analysis. The angles between the principal components 0 and 1 of this report and those of the reference model are '+str(round(np.degrees(np.arccos(min(cos_model[0],1))),1))+' and '+str(round(np.degrees(np.arccos(min(cos_model[1],1))),1))+' degrees, respectively. Table '+str(table_model)+' gives the projections of each student onto the principal components 0 and 1 of the reference model, the corresponding percentages (see Table 8), and the participation ratio in the basis set of the reference principal components.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_model)+'. Projections and percentages of the learning styles of each student on the principal components 0 and 1 of the reference model, and participation ratio in the basis set of the reference principal components'+(', with their percentiles (P) within the students of the reference model' if percentile_proj_ref is not None else '')+'.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(L+1, 6 if percentile_proj_ref is None else 9)
+
+  # Table header
+  t.cell(0,0).text = 'Student'
+  t.cell(0,1).text = Label_PCPC[0]
+  t.cell(0,2).text = Label_PCPC[1]
+  t.cell(0,3).text = Label_PCPC[0] + ' (%)'
+  t.cell(0,4).text = Label_PCPC[1] + ' (%)'
+  t.cell(0,5).text = 'PR'
+  if ( percentile_proj_ref is not None ):
+    t.cell(0,6).text = 'P ' + Label_PCPC[0]
+    t.cell(0,7).text = 'P ' + Label_PCPC[1]
+    t.cell(0,8).text = 'P PR'
+
+  for i in range(0,L):
+    t.cell(i+1,0).text = students[i]
+    t.cell(i+1,1).text = str(round(proj_ref[i,0],2))
+    t.cell(i+1,2).text = str(round(proj_ref[i,1],2))
+    t.cell(i+1,3).text = str(round(prob_ref[i,0],2))
+    t.cell(i+1,4).text = str(round(prob_ref[i,1],2))
+    t.cell(i+1,5).text = str(round(pr_ref[i],2))
+    if ( percentile_proj_ref is not None ):
+      t.cell(i+1,6).text = str(round(percentile_proj_ref[i,0],1))
+      t.cell(i+1,7).text = str(round(percentile_proj_ref[i,1],1))
+      t.cell(i+1,8).text = str(round(percentile_pr_ref[i],1))
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_model)+' with the projections onto the reference model done!')
+  printt('-------------------------------------------')
+
+
+
+document.add_heading('4.'+str(subsection_next)+' Clusters of learning styles', level=2)
+subsection_next = subsection_next + 1
+table_clusters = table_next
+table_next = table_next + 1
+
+printt('-------------------------------------------')
+printt(' Table '+str(table_clusters)+' with the clusters of learning styles...')
+printt('-------------------------------------------')
+
+document.add_paragraph('The students have been grouped in '+str(n_clusters_fit)+' clusters with similar learning styles by means of the k-means method in the space of the '+('projections on the principal components' if clustering_space == 'PC' else 'points of the learning styles')+'. Table '+str(table_clusters)+' gives the number of students of each cluster and its centroid, i.e., the average points of its students for each learning style, along with the corresponding tendency. The cluster of each student can be found in output/chaea3s_results.csv.')
+
+# Table title
+table_title = document.add_paragraph('Table '+str(table_clusters)+'. Number of students and centroids (points and tendencies of the learning styles) of the clusters.')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(n_clusters_fit+1, K+2)
+
+# Table header
+t.cell(0,0).text = 'Cluster'
+t.cell(0,1).text = 'Students (%)'
+for j in range(0,K):
+  t.cell(0,j+2).text = Label_LS[j]
+
+for c in range(0,n_clusters_fit):
+  t.cell(c+1,0).text = str(c)
+  t.cell(c+1,1).text = str(cluster_sizes[c]) + ' (' + str(round(100*cluster_sizes[c]/L,1)) + ')'
+  for j in range(0,K):
+    t.cell(c+1,j+2).text = str(round(centroids_LS[c,j],1)) + ' (' + centroids_tendencies[c][j] + ')'
+
+printt('-------------------------------------------')
+printt(' Table '+str(table_clusters)+' with the clusters of learning styles done!')
+printt('-------------------------------------------')
+
+
+
+document.add_heading('4.'+str(subsection_next)+' Joint tendencies', level=2)
+subsection_next = subsection_next + 1
+table_combinations = table_next
+table_pairs = table_next + 1
+table_next = table_next + 2
+
+printt('-------------------------------------------')
+printt(' Tables '+str(table_combinations)+' and '+str(table_pairs)+' with the joint tendencies...')
+printt('-------------------------------------------')
+
+n_combinations_report = min(10, len(tendency_cube_export))
+document.add_paragraph('Table 3 gives the tendencies towards each learning style separately. The joint distribution of the tendencies towards the four learning styles shows which combinations are frequent. The students of this report show '+str(len(tendency_cube_export))+' of the '+str(tendency_cube.size)+' possible combinations of tendencies. Table '+str(table_combinations)+' gives the '+str(n_combinations_report)+' most frequent ones (all of them can be found in output/chaea3s_tendency_cube.csv). Table '+str(table_pairs)+' summarizes the joint tendencies towards each pair of learning styles (whose full distributions can be found in output/chaea3s_tendency_pairs.csv) by means of the percentage of students with the same tendency towards both learning styles and Cramér\'s V, which ranges from 0 (independent tendencies) to 1 (fully associated tendencies).')
+
+# Table title
+table_title = document.add_paragraph('Table '+str(table_combinations)+'. Most frequent combinations of tendencies towards the learning styles, and number (percentage) of students.')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(n_combinations_report+1, K+1)
+
+# Table header
+for j in range(0,K):
+  t.cell(0,j).text = Label_LS[j]
+t.cell(0,K).text = 'Students (%)'
+
+for i in range(0,n_combinations_report):
+  row = tendency_cube_export.iloc[i]
+  for j in range(0,K):
+    t.cell(i+1,j).text = row[Label_LS[j]]
+  t.cell(i+1,K).text = str(row['Students']) + ' (' + str(round(row['Students (%)'],1)) + ')'
+
+# Table title
+table_title = document.add_paragraph('Table '+str(table_pairs)+'. Percentage of students with the same tendency towards each pair of learning styles, and Cramér\'s V of their joint tendencies.')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(len(learning_pairs)+1, 3)
+
+# Table header
+t.cell(0,0).text = 'Learning styles'
+t.cell(0,1).text = 'Same tendency (%)'
+t.cell(0,2).text = 'V'
+
+for ip, pair in enumerate(learning_pairs):
+  t.cell(ip+1,0).text = Label_LS[pair[0]] + ' - ' + Label_LS[pair[1]]
+  t.cell(ip+1,1).text = str(round(tendency_pairs_same[ip],1))
+  t.cell(ip+1,2).text = str(round(tendency_pairs_V[ip],3))
+
+printt('-------------------------------------------')
+printt(' Tables '+str(table_combinations)+' and '+str(table_pairs)+' with the joint tendencies done!')
+printt('-------------------------------------------')
+
+
+
+if ( len(groups_export) > 0 ):
+  document.add_heading('4.'+str(subsection_next)+' Groups of students', level=2)
+  subsection_next = subsection_next + 1
+  table_groups = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_groups)+' with the groups of students...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('The students have been grouped according to the following variables: '+', '.join(groups_export['Variable'].unique())+'. Table '+str(table_groups)+' gives, for each group, the number of students, the average means of the learning styles with their uncertainties (in parenthesis, see Table 4), the dispersion Σ_1(%) accounted by the principal components 0 and 1 of the group, and the mean participation ratios. The tendencies, affinities and eigenvalues of each group can be found in output/chaea3s_groups.csv.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_groups)+'. Number of students, average means (uncertainties) of the learning styles, dispersion Σ_1(%), and mean participation ratios of the groups of students.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(len(groups_export)+1, K+6)
+
+  # Table header
+  t.cell(0,0).text = 'Variable'
+  t.cell(0,1).text = 'Group'
+  t.cell(0,2).text = 'N'
+  for j in range(0,K):
+    t.cell(0,j+3).text = Label_LS[j]
+  t.cell(0,K+3).text = 'Σ_1(%)'
+  t.cell(0,K+4).text = Label_PR[0]
+  t.cell(0,K+5).text = Label_PR[1]
+
+  for g in range(0,len(groups_export)):
+    row = groups_export.iloc[g]
+    t.cell(g+1,0).text = row['Variable']
+    t.cell(g+1,1).text = row['Group']
+    t.cell(g+1,2).text = str(row['Students'])
+    for j in range(0,K):
+      t.cell(g+1,j+3).text = mean_uncert(row[Label_LS[j]], row['Uncert ' + Label_LS[j]]) if row['Students'] > 1 else str(round(row[Label_LS[j]],2))
+    t.cell(g+1,K+3).text = str(round(row['Sigma_1 (%)'],1))
+    t.cell(g+1,K+4).text = str(round(row[Label_PR[0]],2))
+    t.cell(g+1,K+5).text = str(round(row[Label_PR[1]],2))
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_groups)+' with the groups of students done!')
+  printt('-------------------------------------------')
+
+
+
+document.add_heading('4.'+str(subsection_next)+' Entropies of the learning profiles', level=2)
+subsection_next = subsection_next + 1
+table_entropy = table_next
+table_next = table_next + 1
+
+printt('-------------------------------------------')
+printt(' Table '+str(table_entropy)+' with the entropies...')
+printt('-------------------------------------------')
+
+# Rows: basis sets (LS, PC and, if any, the reference PCA)
+entropy_bases = [['LS', pr[:,0], entropy_LS], ['PC', pr[:,1], entropy_PC]]
+if ( reference_model is not None ):
+  entropy_bases.append(['PC ref.', pr_ref, entropy_ref])
+
+document.add_paragraph('The participation ratios belong to a wider family of measures of the spread of the normalized squared coefficients p_j of each student in a basis set: the Shannon entropy H = -Σ p_j log(p_j) and the Rényi entropies H_q = log(Σ p_j^q)/(1-q), where H_2 = log(PR). Table '+str(table_entropy)+' gives their average means and uncertainties (in parenthesis) for the learning-styles basis set and for the principal components'+(' of this sample and of the reference model' if reference_model is not None else '')+'. Their values for each student can be found in output/chaea3s_results.csv.')
+
+# Table title
+table_title = document.add_paragraph('Table '+str(table_entropy)+'. Average means and uncertainties (in parenthesis) of the participation ratios, the Shannon entropies, and the Rényi entropies of orders q = '+', '.join([str(q) for q in renyi_orders])+'.')
+table_title.alignment = 1  # Center alignment
+title_run = table_title.runs[0]
+title_run.bold = True
+
+t = document.add_table(len(entropy_bases)+1, len(renyi_orders)+3)
+
+# Table header
+t.cell(0,0).text = 'Basis set'
+t.cell(0,1).text = 'PR'
+t.cell(0,2).text = 'H'
+for iq in range(0,len(renyi_orders)):
+  t.cell(0,iq+3).text = 'H_'+str(renyi_orders[iq])
+
+for b in range(0,len(entropy_bases)):
+  statistics_basis = descriptive_statistics(np.column_stack([entropy_bases[b][1], entropy_bases[b][2]]))
+  t.cell(b+1,0).text = entropy_bases[b][0]
+  for j in range(0,len(renyi_orders)+2):
+    t.cell(b+1,j+1).text = mean_uncert(statistics_basis['mean'][j], statistics_basis['uncert'][j])
+
+printt('-------------------------------------------')
+printt(' Table '+str(table_entropy)+' with the entropies done!')
+printt('-------------------------------------------')
+
+
+
+if ( len(reliability_rows) > 0 ):
+  document.add_heading('4.'+str(subsection_next)+' Reliability of the items', level=2)
+  subsection_next = subsection_next + 1
+  table_reliability = table_next
+  table_items = table_next + 1
+  table_next = table_next + 2
+
+  printt('-------------------------------------------')
+  printt(' Tables '+str(table_reliability)+' and '+str(table_items)+' with the reliability of the items...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('The raw answers to the '+str(n_items)+' items of the questionnaire are available for '+str(n_answers)+' of the '+str(L)+' students. Table '+str(table_reliability)+' gives the internal consistency (Cronbach\'s alpha) of the items of each learning style for all these students and for each group of students. Table '+str(table_items)+' summarizes, for each learning style, the corrected item-total correlations (correlation between each item and the score of the rest of the items of its style), the item with the lowest correlation, and the number of items whose deletion would increase alpha. The values for each item can be found in output/chaea3s_items.csv and those of the groups in output/chaea3s_reliability.csv.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_reliability)+'. Cronbach\'s alpha of the items of each learning style for all the students and for the groups of students.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(len(reliability_rows)+1, K+3)
+
+  # Table header
+  t.cell(0,0).text = 'Variable'
+  t.cell(0,1).text = 'Group'
+  t.cell(0,2).text = 'N'
+  for j in range(0,K):
+    t.cell(0,j+3).text = Label_LS[j]
+
+  for g in range(0,len(reliability_rows)):
+    row = reliability_rows[g]
+    t.cell(g+1,0).text = row['Variable']
+    t.cell(g+1,1).text = row['Group']
+    t.cell(g+1,2).text = str(row['Students'])
+    for j in range(0,K):
+      t.cell(g+1,j+3).text = str(round(row['Alpha ' + Label_LS[j]],3))
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_items)+'. Cronbach\'s alpha, mean and minimum corrected item-total correlations (item with the minimum in parenthesis), and number of items whose deletion would increase alpha, for each learning style.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(K+1, 5)
+
+  # Table header
+  t.cell(0,0).text = 'Learning style'
+  t.cell(0,1).text = 'Alpha'
+  t.cell(0,2).text = 'Mean r'
+  t.cell(0,3).text = 'Min. r (item)'
+  t.cell(0,4).text = 'Items increasing alpha'
+
+  for j in range(0,K):
+    items_j = np.where(item_style == j)[0]
+    r_j = statistics_items['r_item_total'][items_j]
+    t.cell(j+1,0).text = Label_LS[j]
+    t.cell(j+1,1).text = str(round(statistics_items['alpha'][j],3))
+    t.cell(j+1,2).text = str(round(np.nanmean(r_j),3))
+    if ( np.isnan(r_j).all() ):
+      t.cell(j+1,3).text = '-'
+    else:
+      t.cell(j+1,3).text = str(round(np.nanmin(r_j),3))+' ('+str(items_j[np.nanargmin(r_j)]+1)+')'
+    t.cell(j+1,4).text = str(int(np.sum(statistics_items['alpha_deleted'][items_j] > statistics_items['alpha'][j])))
+
+  printt('-------------------------------------------')
+  printt(' Tables '+str(table_reliability)+' and '+str(table_items)+' with the reliability of the items done!')
+  printt('-------------------------------------------')
+
+
+
+if ( (len(reliability_rows) > 0) and item_pca ):
+  document.add_heading('4.'+str(subsection_next)+' Principal components of the items', level=2)
+  subsection_next = subsection_next + 1
+  table_item_pca = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_item_pca)+' with the principal components of the items...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('The principal components of the raw answers have been obtained from the '+('tetrachoric (cosine-π approximation)' if item_correlation == 'tetrachoric' else 'Pearson')+' correlation matrix of the '+str(n_items)+' items. If the four learning styles describe the answers of the students, the items of each style should load mainly on a different component. Table '+str(table_item_pca)+' gives the eigenvalues of the first '+str(n_components)+' components, the percentage of the variance of the items they account for, and the mean absolute loadings of the items of each learning style. The loadings of each item can be found in output/chaea3s_item_loadings.csv.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_item_pca)+'. Eigenvalues, variance (%), and mean absolute loadings of the items of each learning style on the principal components of the items.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(K+3, n_components+1)
+
+  # Table header
+  t.cell(0,0).text = ' '
+  t.cell(1,0).text = 'Eigenvalue'
+  t.cell(2,0).text = 'Variance (%)'
+  for j in range(0,K):
+    t.cell(j+3,0).text = Label_LS[j]
+  for ic in range(0,n_components):
+    t.cell(0,ic+1).text = 'PC'+str(ic)
+    t.cell(1,ic+1).text = str(round(item_eigenValues[ic],2))
+    t.cell(2,ic+1).text = str(round(item_variance[ic],1))
+    for j in range(0,K):
+      t.cell(j+3,ic+1).text = str(round(item_loadings_LS[j,ic],3))
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_item_pca)+' with the principal components of the items done!')
+  printt('-------------------------------------------')
+
+
+
+if ( len(longitudinal_rows) > 0 ):
+  document.add_heading('4.'+str(subsection_next)+' Changes between terms', level=2)
+  subsection_next = subsection_next + 1
+  table_changes = table_next
+  table_next = table_next + 1
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_changes)+' with the changes between terms...')
+  printt('-------------------------------------------')
+
+  document.add_paragraph('The students identified by the column '+longitudinal_id+' of the metadata file have been followed across the terms ('+longitudinal_term+') stored in '+longitudinal_file+'. Table '+str(table_changes)+' gives, for each pair of consecutive terms, the number of students who took the questionnaire in both terms, the average changes of their learning styles and of their projections on the principal components'+(' of the reference model' if reference_model is not None else '')+' with the corresponding uncertainties (in parenthesis), and the percentage of students whose tendency changed. The changes of each student can be found in output/chaea3s_changes.csv.')
+
+  # Table title
+  table_title = document.add_paragraph('Table '+str(table_changes)+'. Number of students and average changes (uncertainties) of the learning styles and of the projections on the principal components between consecutive terms. The percentage of students whose tendency changed is given in brackets.')
+  table_title.alignment = 1  # Center alignment
+  title_run = table_title.runs[0]
+  title_run.bold = True
+
+  t = document.add_table(len(longitudinal_rows)+1, 2*K+2)
+
+  # Table header
+  t.cell(0,0).text = 'Terms'
+  t.cell(0,1).text = 'N'
+  for j in range(0,K):
+    t.cell(0,j+2).text = Label_LS[j]
+    t.cell(0,K+j+2).text = Label_PCPC[j]
+
+  for g in range(0,len(longitudinal_rows)):
+    row = longitudinal_rows[g]
+    t.cell(g+1,0).text = row['Term before']+' → '+row['Term after']
+    t.cell(g+1,1).text = str(row['Students'])
+    for j in range(0,K):
+      if ( row['Students'] > 1 ):
+        t.cell(g+1,j+2).text = mean_uncert(row['Change ' + Label_LS[j]], row['Uncert ' + Label_LS[j]])+' ['+str(round(row['Tendency changed ' + Label_LS[j] + ' (%)'],1))+'%]'
+        t.cell(g+1,K+j+2).text = mean_uncert(row['Change proj ' + Label_PCPC[j]], row['Uncert proj ' + Label_PCPC[j]])
+      else:
+        t.cell(g+1,j+2).text = str(round(row['Change ' + Label_LS[j]],2))+' ['+str(round(row['Tendency changed ' + Label_LS[j] + ' (%)'],1))+'%]'
+        t.cell(g+1,K+j+2).text = str(round(row['Change proj ' + Label_PCPC[j]],2))
+
+  printt('-------------------------------------------')
+  printt(' Table '+str(table_changes)+' with the changes between terms done!')
+  printt('-------------------------------------------')
+
+
+
+
 
 
 